@@ -23,6 +23,8 @@ Previous v8.1 fixes:
 
 """
 
+from __future__ import annotations
+
 import sys
 import os
 import subprocess
@@ -32,19 +34,26 @@ import json
 import pickle
 import argparse
 import glob
-from collections import defaultdict
-from datetime import datetime, timedelta
+import heapq
+import importlib
+import importlib.util
+import io
+import contextlib
+import math
+import copy
+import multiprocessing
+import socket
+import sqlite3
+import struct
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Tuple, List, Dict, Any
 import numpy as np
 import pandas as pd
 
-# --- NEW QUANT LIBRARIES ---
-try:
-    from hmmlearn.hmm import GaussianHMM
-except ImportError:
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "hmmlearn"])
-    from hmmlearn.hmm import GaussianHMM
-
 warnings.filterwarnings('ignore')
 
 # --- CONFIGURATION: MT5 PATH ---
@@ -60,36 +69,152 @@ os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 
 
 def install_package(package_name: str, pip_name: Optional[str] = None) -> None:
-    try:
-        __import__(package_name)
-    except (ImportError, ModuleNotFoundError):
+    # find_spec only locates the package, so the check doesn't import it
+    if importlib.util.find_spec(package_name) is None:
         install_name = pip_name or package_name
         subprocess.check_call([sys.executable, "-m", "pip", "install", install_name])
 
 
 required_packages = [
-    ('MetaTrader5', 'MetaTrader5'), ('pandas', 'pandas'), ('numpy', 'numpy'),
+    ('pandas', 'pandas'), ('numpy', 'numpy'),
     ('tensorflow', 'tensorflow'), ('sklearn', 'scikit-learn'),
-    ('lightgbm', 'lightgbm'), ('keras_tuner', 'keras-tuner')
+    ('lightgbm', 'lightgbm'), ('keras_tuner', 'keras-tuner'), ('hmmlearn', 'hmmlearn')
 ]
+# The MetaTrader5 package only exists for Windows; elsewhere bars come from --data-dir
+if sys.platform == 'win32':
+    required_packages.insert(0, ('MetaTrader5', 'MetaTrader5'))
+
+
+def check_dependencies() -> None:
+    """Install any missing required package (called by main(), not on import)."""
+    global mt5
+    for package, pip_name in required_packages:
+        install_package(package, pip_name)
+    if mt5 is None and importlib.util.find_spec('MetaTrader5') is not None:
+        import MetaTrader5 as mt5
+
+
+class _LazyImport:
+    """
+    Stand-in for a module, or an attribute of one, that is imported on first use.
+
+    Keeps TensorFlow, Keras, LightGBM and friends out of the import path so
+    --help, the daemon client and LightGBM-only runs start quickly.
+    """
+
+    def __init__(self, module: str, attr: Optional[str] = None):
+        self._module = module
+        self._attr = attr
+        self._target = None
+
+    def _resolve(self) -> Any:
+        if self._target is None:
+            # Symbol worker threads can hit the same stand-in at once
+            with _IMPORT_LOCK:
+                if self._target is None:
+                    module = importlib.import_module(self._module)
+                    _configure_tensorflow()
+                    self._target = getattr(module, self._attr) if self._attr else module
+        return self._target
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resolve(), name)
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self._resolve()(*args, **kwargs)
+
+
+_IMPORT_LOCK = threading.Lock()
+_TF_CONFIGURED = False
 
-for package, pip_name in required_packages:
-    install_package(package, pip_name)
 
-import MetaTrader5 as mt5
-import tensorflow as tf
-import keras
-from keras import layers
-from keras.models import Model, load_model
-from keras.optimizers import Adam
-from keras.callbacks import EarlyStopping, ReduceLROnPlateau
-from sklearn.preprocessing import RobustScaler
-import lightgbm as lgb
-import keras_tuner as kt
+def _configure_tensorflow() -> None:
+    """Apply the global TensorFlow settings once TensorFlow has been imported."""
+    global _TF_CONFIGURED
+    if _TF_CONFIGURED or 'tensorflow' not in sys.modules:
+        return
+    _TF_CONFIGURED = True
+    tf_module = sys.modules['tensorflow']
+    tf_module.random.set_seed(42)
+    tf_module.config.run_functions_eagerly(False)
+
+
+try:
+    import MetaTrader5 as mt5
+except ImportError:
+    mt5 = None
+tf = _LazyImport('tensorflow')
+keras = _LazyImport('keras')
+layers = _LazyImport('keras', 'layers')
+Model = _LazyImport('keras.models', 'Model')
+load_model = _LazyImport('keras.models', 'load_model')
+Adam = _LazyImport('keras.optimizers', 'Adam')
+EarlyStopping = _LazyImport('keras.callbacks', 'EarlyStopping')
+ReduceLROnPlateau = _LazyImport('keras.callbacks', 'ReduceLROnPlateau')
+RobustScaler = _LazyImport('sklearn.preprocessing', 'RobustScaler')
+lgb = _LazyImport('lightgbm')
+kt = _LazyImport('keras_tuner')
+GaussianHMM = _LazyImport('hmmlearn.hmm', 'GaussianHMM')
 
 np.random.seed(42)
-tf.random.set_seed(42)
-tf.config.run_functions_eagerly(False)
+
+
+# Horizons covered by a multi-head model, in output column order
+MULTI_HEAD_TIMEFRAMES = ['1H', '4H', '1D']
+# Target key of the stacked multi-head training targets
+MULTI_HEAD_TARGET = 'MH'
+# Layout of the rate arrays returned by MetaTrader5 copy_rates_*
+RATES_DTYPE = np.dtype([('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+                        ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')])
+# Binary prediction record the EA reads with one FileReadStruct (CPredictionRecordBin in the .mq5):
+# magic, version, sequence, publish time, current price, prediction/change_pct/ensemble_std for
+# 1H/4H/1D, trade_allowed, then an FNV-1a checksum of all preceding bytes
+PREDICTION_RECORD_MAGIC = 0x48544747  # 'GGTH'
+PREDICTION_RECORD_VERSION = 1
+PREDICTION_RECORD = struct.Struct('<IIqqd3d3d3di')
+PREDICTION_RECORD_TIMEFRAMES = ['1H', '4H', '1D']
+# Binary Strategy Tester lookup ({SYMBOL}_{TF}_lookup.bin): a header (magic, version, record size,
+# reserved, record count, first and last timestamp) followed by time-sorted records laid out like
+# the EA's CCSVPrediction struct, so the EA loads them with one FileReadArray and binary-searches them
+LOOKUP_FILE_MAGIC = 0x4C544747  # 'GGTL'
+LOOKUP_FILE_VERSION = 1
+LOOKUP_HEADER = struct.Struct('<IIIIqqq')
+LOOKUP_RECORD_DTYPE = np.dtype([('timestamp', '<i8'), ('prediction', '<f8'),
+                                ('change_pct', '<f8'), ('ensemble_std', '<f8')])
+# Largest |TFLite - Keras| difference in scaled model output accepted when exporting a model
+INFERENCE_PARITY_TOLERANCE = 1e-4
+
+
+def fnv1a_32(data: bytes) -> int:
+    """32-bit FNV-1a hash; simple enough to recompute in MQL5."""
+    h = 0x811C9DC5
+    for byte in data:
+        h = ((h ^ byte) * 0x01000193) & 0xFFFFFFFF
+    return h
+
+
+def atomic_write(file_path: str, data: bytes, retries: int = 5) -> None:
+    """
+    Replace file_path with data so readers see either the old or the new file, never a torn one.
+
+    Writes a temp file in the same directory, fsyncs it and renames it over
+    the target.  On Windows the rename fails while a reader has the file
+    open, so it is retried briefly.
+    """
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    for attempt in range(retries):
+        try:
+            os.replace(tmp_path, file_path)
+            return
+        except PermissionError:
+            if attempt == retries - 1:
+                os.remove(tmp_path)
+                raise
+            time.sleep(0.05)
 
 
 # --- Helper Classes ---
@@ -110,88 +235,1132 @@ class KalmanFilter:
         return self.x
 
 
-@keras.saving.register_keras_serializable(package="Custom", name="TransformerBlock")
-class TransformerBlock(layers.Layer):
-    def __init__(self, embed_dim: int, num_heads: int, ff_dim: int, rate: float = 0.1, **kwargs):
-        super(TransformerBlock, self).__init__(**kwargs)
-        self.embed_dim = embed_dim
-        self.num_heads = num_heads
-        self.ff_dim = ff_dim
-        self.rate = rate
-        self.att = layers.MultiHeadAttention(num_heads=num_heads, key_dim=embed_dim)
-        self.ffn = tf.keras.Sequential([
-            layers.Dense(ff_dim, activation="relu"),
-            layers.Dense(embed_dim)
-        ])
-        self.layernorm1 = layers.LayerNormalization(epsilon=1e-6)
-        self.layernorm2 = layers.LayerNormalization(epsilon=1e-6)
-        self.dropout1 = layers.Dropout(rate)
-        self.dropout2 = layers.Dropout(rate)
-
-    def call(self, inputs, training=False):
-        attn_output = self.att(inputs, inputs)
-        attn_output = self.dropout1(attn_output, training=training)
-        out1 = self.layernorm1(inputs + attn_output)
-        ffn_output = self.ffn(out1)
-        ffn_output = self.dropout2(ffn_output, training=training)
-        return self.layernorm2(out1 + ffn_output)
-
-    def get_config(self):
-        config = super().get_config()
-        config.update({
-            'embed_dim': self.embed_dim,
-            'num_heads': self.num_heads,
-            'ff_dim': self.ff_dim,
-            'rate': self.rate
-        })
-        return config
-    
-    @classmethod
-    def from_config(cls, config):
-        return cls(**config)
-
-
-@keras.saving.register_keras_serializable(package="Custom", name="AttentionLayer")
-class AttentionLayer(layers.Layer):
-    """Simple attention mechanism for LSTM outputs."""
-    
-    def __init__(self, **kwargs):
-        super(AttentionLayer, self).__init__(**kwargs)
-
-    def build(self, input_shape):
-        self.W = self.add_weight(
-            name='attention_weight',
-            shape=(input_shape[-1], input_shape[-1]),
-            initializer='glorot_uniform',
-            trainable=True
-        )
-        self.b = self.add_weight(
-            name='attention_bias',
-            shape=(input_shape[-1],),
-            initializer='zeros',
-            trainable=True
-        )
-        self.u = self.add_weight(
-            name='attention_context',
-            shape=(input_shape[-1],),
-            initializer='glorot_uniform',
-            trainable=True
-        )
-        super(AttentionLayer, self).build(input_shape)
+class MultiHeadView:
+    """
+    Single-horizon view of a multi-head model.
+
+    Calling it behaves like a one-output Keras model (returns shape
+    (batch, 1)), so the per-timeframe prediction paths can use it unchanged.
+    """
+
+    def __init__(self, model: Any, head_index: int):
+        self.model = model
+        self.head_index = head_index
+
+    def __call__(self, inputs, training: bool = False):
+        return self.model(inputs, training=training)[:, self.head_index:self.head_index + 1]
+
+
+class InferenceOutput(np.ndarray):
+    """ndarray with an eager tensor's .numpy(), so TFLite outputs fit the Keras call sites."""
+
+    def numpy(self) -> np.ndarray:
+        return np.asarray(self)
+
+
+class TFLiteModel:
+    """
+    Exported TensorFlow Lite model that can be called like the Keras model it came from.
+
+    Models are exported with a batch size of one, so a batch is run window by
+    window.  Uses the standalone LiteRT / tflite-runtime interpreter when one
+    is installed, which keeps TensorFlow out of the serving process entirely.
+    """
+
+    def __init__(self, model_path: str, model_content: Optional[bytes] = None, num_threads: int = 1):
+        self.model_path = model_path
+        interpreter_class = self.interpreter_class()
+        if model_content is not None:
+            self.interpreter = interpreter_class(model_content=model_content, num_threads=num_threads)
+        else:
+            self.interpreter = interpreter_class(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input_index = self.interpreter.get_input_details()[0]['index']
+        output_details = self.interpreter.get_output_details()[0]
+        self.output_index = output_details['index']
+        self.output_width = int(output_details['shape'][-1])
+        # One interpreter per model; it isn't safe to invoke from two threads at once
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def interpreter_class() -> type:
+        """Lightest available TFLite interpreter: LiteRT, then tflite-runtime, then TensorFlow's."""
+        for module_name in ('ai_edge_litert.interpreter', 'tflite_runtime.interpreter'):
+            try:
+                return importlib.import_module(module_name).Interpreter
+            except ImportError:
+                continue
+        return tf.lite.Interpreter
+
+    def __call__(self, inputs, training: bool = False) -> InferenceOutput:
+        X = np.asarray(inputs, dtype=np.float32)
+        outputs = np.empty((len(X), self.output_width), dtype=np.float32)
+        with self.lock:
+            for i in range(len(X)):
+                self.interpreter.set_tensor(self.input_index, X[i:i + 1])
+                self.interpreter.invoke()
+                outputs[i] = self.interpreter.get_tensor(self.output_index)[0]
+        return outputs.view(InferenceOutput)
+
+
+class StreamingQuantile:
+    """
+    Exact running percentile of a growing sample, kept in two heaps.
+
+    The lower max-heap holds every order statistic up to the interpolation
+    point and the upper min-heap holds the rest, so an insert costs O(log n)
+    and reading the value is O(1).  Uses the same linear interpolation as
+    np.percentile (and np.median for q=50).
+    """
+
+    def __init__(self, q: float):
+        self.q = q / 100.0
+        self.lower: List[float] = []  # max-heap, stored negated
+        self.upper: List[float] = []  # min-heap
+
+    def __len__(self) -> int:
+        return len(self.lower) + len(self.upper)
+
+    def extend(self, values: np.ndarray) -> None:
+        values = values[~np.isnan(values)]
+        if len(values) > len(self):
+            # Bulk load: cheaper to sort everything once than to push one by one
+            merged = np.sort(np.concatenate([-np.asarray(self.lower), np.asarray(self.upper), values]))
+            split = self._lower_size(len(merged))
+            self.lower = (-merged[:split][::-1]).tolist()
+            self.upper = merged[split:].tolist()
+            return
+        for value in values.tolist():
+            if self.lower and value <= -self.lower[0]:
+                heapq.heappush(self.lower, -value)
+            else:
+                heapq.heappush(self.upper, value)
+            target = self._lower_size(len(self))
+            while len(self.lower) > target:
+                heapq.heappush(self.upper, -heapq.heappop(self.lower))
+            while len(self.lower) < target:
+                heapq.heappush(self.lower, -heapq.heappop(self.upper))
+
+    def _lower_size(self, n: int) -> int:
+        return int(np.floor(self.q * (n - 1))) + 1 if n > 0 else 0
+
+    @property
+    def value(self) -> float:
+        n = len(self)
+        if n == 0:
+            return np.nan
+        virtual_index = self.q * (n - 1)
+        gamma = virtual_index - np.floor(virtual_index)
+        a = -self.lower[0]
+        if gamma == 0 or not self.upper:
+            return a
+        b = self.upper[0]
+        if self.q == 0.5:
+            return (a + b) / 2.0
+        diff = b - a
+        return b - diff * (1 - gamma) if gamma >= 0.5 else a + diff * gamma
+
+
+class ExpandingRobustScaler:
+    """
+    RobustScaler whose statistics cover an expanding window of rows.
+
+    partial_fit() appends rows as a walk-forward advances; center_ (median)
+    and scale_ (IQR) always equal a RobustScaler refit on every row seen so
+    far, at a cost proportional to the new rows only.
+    """
+
+    def __init__(self, quantile_range: Tuple[float, float] = (25.0, 75.0)):
+        self.quantile_range = quantile_range
+        self._columns: List[Tuple[StreamingQuantile, StreamingQuantile, StreamingQuantile]] = []
+        self.n_samples_seen_ = 0
+
+    def partial_fit(self, X: np.ndarray) -> 'ExpandingRobustScaler':
+        X = np.asarray(X, dtype=np.float64)
+        if len(X) == 0:
+            return self
+        if not self._columns:
+            q_min, q_max = self.quantile_range
+            self._columns = [(StreamingQuantile(q_min), StreamingQuantile(50.0), StreamingQuantile(q_max))
+                             for _ in range(X.shape[1])]
+        for j, quantiles in enumerate(self._columns):
+            for sq in quantiles:
+                sq.extend(X[:, j])
+        self.n_samples_seen_ += len(X)
+        return self
+
+    @property
+    def center_(self) -> np.ndarray:
+        return np.array([median.value for _, median, _ in self._columns])
+
+    @property
+    def scale_(self) -> np.ndarray:
+        scale = np.array([q_max.value - q_min.value for q_min, _, q_max in self._columns])
+        # Same zero-scale handling as sklearn's RobustScaler
+        scale[scale < 10 * np.finfo(scale.dtype).eps] = 1.0
+        return scale
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        return (np.asarray(X, dtype=np.float64) - self.center_) / self.scale_
+
+    def inverse_transform(self, X: np.ndarray) -> np.ndarray:
+        return np.asarray(X, dtype=np.float64) * self.scale_ + self.center_
+
+
+class BarCache:
+    """
+    On-disk store of MT5 rate arrays, one .npy file per symbol and timeframe.
+
+    Arrays keep the structured dtype returned by copy_rates_*, sorted by
+    'time'.  A small JSON sidecar records how far back history has already
+    been requested so repeated runs don't re-download it.
+    """
+
+    BAR_SECONDS = {'H1': 3600, 'H4': 4 * 3600, 'D1': 24 * 3600}
+    # Bars re-fetched before the cached tail to detect revisions and gaps at the seam
+    OVERLAP_BARS = 24
+
+    def __init__(self, cache_dir: str, symbol: str):
+        self.cache_dir = cache_dir
+        self.symbol = symbol
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, timeframe: str) -> Tuple[str, str]:
+        stem = os.path.join(self.cache_dir, f"{self.symbol}_{timeframe}")
+        return stem + '.npy', stem + '.json'
+
+    def load(self, timeframe: str) -> Tuple[Optional[np.ndarray], Dict[str, Any]]:
+        """
+        Load cached bars and their metadata.
+
+        A cache that fails the integrity check is discarded so it gets rebuilt.
+
+        Returns:
+            Tuple of (rates or None, metadata dict)
+        """
+        data_path, meta_path = self._paths(timeframe)
+        if not os.path.exists(data_path):
+            return None, {}
+        try:
+            # Loaded fully rather than memory-mapped: Windows can't replace a mapped file
+            rates = np.load(data_path)
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+        except Exception as e:
+            print(f"   Bar cache {os.path.basename(data_path)} unreadable ({e}), rebuilding")
+            return None, {}
+        problem = self.validate(rates)
+        if problem:
+            print(f"   Bar cache {os.path.basename(data_path)} failed integrity check ({problem}), rebuilding")
+            return None, {}
+        return rates, meta
+
+    def save(self, timeframe: str, rates: np.ndarray, meta: Dict[str, Any]) -> None:
+        """Write bars and metadata, replacing the previous files atomically."""
+        data_path, meta_path = self._paths(timeframe)
+        buffer = io.BytesIO()
+        np.save(buffer, np.ascontiguousarray(rates))
+        atomic_write(data_path, buffer.getvalue())
+        atomic_write(meta_path, json.dumps(meta).encode('utf-8'))
+
+    @staticmethod
+    def unchanged(cached: Optional[np.ndarray], cached_meta: Dict[str, Any],
+                  rates: np.ndarray, meta: Dict[str, Any]) -> bool:
+        """True if rates and meta are identical to what was loaded, so there is nothing to write."""
+        return (cached is not None and meta == cached_meta and len(rates) == len(cached)
+                and np.array_equal(rates, cached))
+
+    @staticmethod
+    def validate(rates: np.ndarray) -> Optional[str]:
+        """Return a description of the first integrity problem, or None if the bars look sane."""
+        if len(rates) == 0:
+            return "empty"
+        if np.any(np.diff(rates['time']) <= 0):
+            return "timestamps not strictly increasing"
+        prices = np.column_stack([rates[col] for col in ('open', 'high', 'low', 'close')])
+        if not np.all(np.isfinite(prices)) or np.any(prices <= 0):
+            return "non-positive or missing prices"
+        return None
+
+    @staticmethod
+    def merge(cached: np.ndarray, fresh: np.ndarray) -> Tuple[np.ndarray, int]:
+        """
+        Merge freshly downloaded bars into the cache.
+
+        Fresh bars replace every cached bar inside their time span, so bars
+        the broker has revised or removed are corrected.  The last cached bar
+        is usually the one that was still forming, so a change to it doesn't
+        count as a revision.
+
+        Returns:
+            Tuple of (merged rates, number of revised cached bars)
+        """
+        t0, t1 = fresh['time'][0], fresh['time'][-1]
+        lo = np.searchsorted(cached['time'], t0, side='left')
+        hi = np.searchsorted(cached['time'], t1, side='right')
+        overlap = np.asarray(cached[lo:hi])
+        if len(overlap) and hi == len(cached):
+            overlap = overlap[:-1]
+
+        revised = 0
+        if len(overlap):
+            pos = np.minimum(np.searchsorted(fresh['time'], overlap['time']), len(fresh) - 1)
+            present = fresh['time'][pos] == overlap['time']
+            matched, kept = fresh[pos[present]], overlap[present]
+            changed = np.zeros(len(kept), dtype=bool)
+            for col in ('open', 'high', 'low', 'close'):
+                changed |= matched[col] != kept[col]
+            revised = int((~present).sum() + changed.sum())
+
+        merged = np.concatenate([np.asarray(cached[:lo]), fresh, np.asarray(cached[hi:])])
+        return merged, revised
+
+
+class EvaluationStore:
+    """
+    Predictions waiting to be scored against the realised price, kept in SQLite.
+
+    Rows are appended once and deleted when resolved; an index on the
+    evaluation time makes the "due" query O(log n) regardless of how many
+    entries are still pending.  Entries that stay unresolved past the
+    retention window (e.g. targets that fell on a weekend) are pruned so
+    the store stays bounded.
+
+    Times are on the broker clock: naive datetimes are broker wall time and
+    are stored as if UTC, the same convention as MT5 bar times.
+    """
+
+    def __init__(self, path: str, retention_days: float = 7.0):
+        self.path = path
+        self.retention = timedelta(days=retention_days)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS evaluations ("
+                         "id INTEGER PRIMARY KEY AUTOINCREMENT, eval_ts REAL NOT NULL, "
+                         "pred_timestamp TEXT, timeframe TEXT, start_price REAL, predictions TEXT)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluations_eval_ts ON evaluations (eval_ts)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _run(self, fn) -> Any:
+        conn = self._connect()
+        try:
+            with conn:
+                return fn(conn)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _epoch(moment: datetime) -> float:
+        return moment.replace(tzinfo=timezone.utc).timestamp() if moment.tzinfo is None else moment.timestamp()
+
+    def append(self, entries: List[Dict[str, Any]]) -> None:
+        """Add pending evaluations (dicts in the pending_evaluations JSON layout)."""
+        rows = [(self._epoch(datetime.fromisoformat(e['eval_timestamp'])),
+                 e['pred_timestamp'], e['timeframe'], float(e['start_price']), json.dumps(e['predictions']))
+                for e in entries]
+        self._run(lambda conn: conn.executemany(
+            "INSERT INTO evaluations (eval_ts, pred_timestamp, timeframe, start_price, predictions) "
+            "VALUES (?, ?, ?, ?, ?)", rows))
+
+    def due(self, now: datetime) -> List[Tuple[int, Dict[str, Any]]]:
+        """Entries whose evaluation time has passed, oldest first, as (row id, entry)."""
+        rows = self._run(lambda conn: conn.execute(
+            "SELECT id, eval_ts, pred_timestamp, timeframe, start_price, predictions FROM evaluations "
+            "WHERE eval_ts <= ? ORDER BY eval_ts", (self._epoch(now),)).fetchall())
+        due = []
+        for row_id, eval_ts, pred_ts, tf_name, price, preds in rows:
+            eval_time = datetime.fromtimestamp(eval_ts, tz=timezone.utc).replace(tzinfo=None)
+            due.append((row_id, {'eval_timestamp': eval_time.isoformat(), 'pred_timestamp': pred_ts,
+                                 'timeframe': tf_name, 'start_price': price, 'predictions': json.loads(preds)}))
+        return due
+
+    def resolve(self, ids: List[int]) -> None:
+        """Remove evaluated entries."""
+        if ids:
+            self._run(lambda conn: conn.executemany("DELETE FROM evaluations WHERE id = ?",
+                                                    [(i,) for i in ids]))
+
+    def prune(self, now: datetime) -> int:
+        """Drop entries overdue by more than the retention window; returns how many."""
+        cutoff = self._epoch(now - self.retention)
+        return self._run(lambda conn: conn.execute(
+            "DELETE FROM evaluations WHERE eval_ts < ?", (cutoff,)).rowcount)
+
+    def count(self) -> int:
+        return self._run(lambda conn: conn.execute("SELECT COUNT(*) FROM evaluations").fetchone()[0])
+
+    def import_json(self, json_path: str) -> int:
+        """
+        One-off migration of a legacy pending_evaluations JSON list.
+
+        The JSON file is renamed to *.migrated afterwards so it is not imported twice.
+        """
+        if not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, 'r') as f:
+                pending = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            pending = []
+        self.append(pending)
+        os.replace(json_path, json_path + '.migrated')
+        return len(pending)
+
+
+class EnsembleScorer:
+    """
+    Rolling ensemble errors and softmax weights, kept separately per timeframe.
+
+    Absolute errors of evaluated predictions live in a NumPy ring buffer
+    shaped (timeframe, model, window), and the weights of every timeframe are
+    recomputed in one vectorised pass.  The backtest generators apply the same
+    weighting walk-forward through walk_forward_weights().
+    """
+
+    # Evaluated predictions a timeframe needs before its weights move off uniform
+    MIN_SAMPLES = 5
+
+    def __init__(self, timeframes: List[str], n_models: int, window: int = 20,
+                 temperature: float = 2.0, learning_rate: float = 0.1):
+        self.timeframes = list(timeframes)
+        self.n_models = n_models
+        self.window = window
+        # Higher temperature = more equal weights, lower = more extreme
+        self.temperature = temperature
+        self.learning_rate = learning_rate
+        self.errors = np.full((len(self.timeframes), n_models, window), np.nan)
+        self.next_slot = np.zeros(len(self.timeframes), dtype=np.int64)
+        self.weights = np.full((len(self.timeframes), n_models), 1.0 / max(n_models, 1))
+
+    def record(self, timeframe: str, predictions: List[float], actual: float) -> None:
+        """Store the absolute errors of one evaluated prediction (NaN = model had no prediction)."""
+        row = self.timeframes.index(timeframe)
+        predictions = np.asarray(predictions, dtype=np.float64)[:self.n_models]
+        errors = np.full(self.n_models, np.nan)
+        errors[:len(predictions)] = np.abs(predictions - actual)
+        self.errors[row, :, self.next_slot[row] % self.window] = errors
+        self.next_slot[row] += 1
+
+    def sample_counts(self) -> np.ndarray:
+        return np.minimum(self.next_slot, self.window)
+
+    @staticmethod
+    def mean_errors(errors: np.ndarray, axis: int = -1) -> np.ndarray:
+        """Mean over the finite entries along axis; NaN where there are none."""
+        valid = np.isfinite(errors)
+        counts = valid.sum(axis=axis)
+        sums = np.where(valid, errors, 0.0).sum(axis=axis)
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+    @staticmethod
+    def softmax_weights(avg_errors: np.ndarray, temperature: float) -> np.ndarray:
+        """
+        Softmax of the negated errors relative to the best model, along the last axis.
+
+        Dividing by the smallest error keeps any single model from dominating
+        when every error is tiny.  Models without an error get zero weight;
+        rows without any error come back all zero.
+        """
+        finite = np.isfinite(avg_errors)
+        min_error = np.where(finite, avg_errors, np.inf).min(axis=-1, keepdims=True)
+        normalized = avg_errors / np.maximum(min_error, 1e-12)
+        exp_neg = np.where(finite, np.exp(-np.where(finite, normalized, 0.0) / temperature), 0.0)
+        total = exp_neg.sum(axis=-1, keepdims=True)
+        return np.divide(exp_neg, total, out=np.zeros_like(exp_neg), where=total > 0)
+
+    def update(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Move every timeframe's weights towards the softmax of its recent errors.
+
+        Returns:
+            Tuple of (mean errors (timeframe x model), timeframes that were updated)
+        """
+        avg_errors = self.mean_errors(self.errors)
+        target = self.softmax_weights(avg_errors, self.temperature)
+        ready = (self.sample_counts() >= self.MIN_SAMPLES) & (target.sum(axis=1) > 0)
+
+        # Smooth weight updates, then renormalise
+        smoothed = (1 - self.learning_rate) * self.weights + self.learning_rate * target
+        smoothed /= np.maximum(smoothed.sum(axis=1, keepdims=True), 1e-12)
+        self.weights = np.where(ready[:, None], smoothed, self.weights)
+        return avg_errors, ready
+
+    def weights_for(self, timeframe: str) -> np.ndarray:
+        return self.weights[self.timeframes.index(timeframe)]
+
+    def state(self) -> Dict[str, Any]:
+        return {'timeframes': self.timeframes, 'errors': self.errors.tolist(),
+                'next_slot': self.next_slot.tolist(), 'weights': self.weights.tolist()}
+
+    def load_state(self, state: Dict[str, Any]) -> bool:
+        """Restore state(); returns False (and changes nothing) if the shapes don't match."""
+        errors = np.asarray(state.get('errors', []), dtype=np.float64)
+        weights = np.asarray(state.get('weights', []), dtype=np.float64)
+        if (state.get('timeframes') != self.timeframes or errors.shape != self.errors.shape
+                or weights.shape != self.weights.shape):
+            return False
+        self.errors = errors
+        self.next_slot = np.asarray(state['next_slot'], dtype=np.int64)
+        self.weights = weights
+        return True
+
+    @staticmethod
+    def combine(model_prices: np.ndarray, weights: np.ndarray, fallback: np.ndarray) -> np.ndarray:
+        """
+        Weighted ensemble price per row of a (bars x model) array.
+
+        NaN/inf prices are skipped and the remaining weights renormalised;
+        rows where no model produced a valid price use ``fallback``.
+        """
+        valid = np.isfinite(model_prices)
+        prices = np.where(valid, model_prices, 0.0)
+        w = np.where(valid, weights, 0.0)
+        total = w.sum(axis=1)
+        counts = valid.sum(axis=1)
+        weighted = (prices * w).sum(axis=1) / np.where(total > 0, total, 1.0)
+        mean = prices.sum(axis=1) / np.maximum(counts, 1)
+        return np.where(total > 0, weighted, np.where(counts > 0, mean, fallback))
+
+    def walk_forward_weights(self, model_prices: np.ndarray, actual: np.ndarray,
+                             pred_pos: np.ndarray, resolve_pos: np.ndarray) -> np.ndarray:
+        """
+        Weights the live scorer would have used at each historical bar.
+
+        Row i may only use predictions whose target bar (resolve_pos) is at or
+        before its own bar (pred_pos[i]); the rolling window mean errors of
+        all rows come from cumulative sums, the softmax is vectorised, and
+        only the per-cycle weight smoothing is a short loop.
+
+        Args:
+            model_prices: (bars x model) predicted prices, NaN where missing
+            actual: Realised price at each row's target bar (NaN if unknown)
+            pred_pos: Ascending bar positions of the rows
+            resolve_pos: Bar position at which each row's target is known
+
+        Returns:
+            (bars x model) weights
+        """
+        n_rows, n_models = model_prices.shape
+        errors = np.abs(model_prices - actual[:, None])
+        valid = np.isfinite(errors)
+        cum_sum = np.vstack([np.zeros(n_models), np.cumsum(np.where(valid, errors, 0.0), axis=0)])
+        cum_count = np.vstack([np.zeros(n_models), np.cumsum(valid, axis=0)])
+
+        resolved = np.searchsorted(resolve_pos, pred_pos, side='right')
+        start = np.maximum(resolved - self.window, 0)
+        counts = cum_count[resolved] - cum_count[start]
+        avg_errors = np.where(counts > 0, (cum_sum[resolved] - cum_sum[start]) / np.maximum(counts, 1), np.nan)
+        target = self.softmax_weights(avg_errors, self.temperature)
+        ready = (resolved - start >= self.MIN_SAMPLES) & (target.sum(axis=1) > 0)
+
+        weights = np.empty((n_rows, n_models))
+        current = np.full(n_models, 1.0 / max(n_models, 1))
+        for i in range(n_rows):
+            if ready[i]:
+                current = (1 - self.learning_rate) * current + self.learning_rate * target[i]
+                current /= current.sum()
+            weights[i] = current
+        return weights
+
+
+class RollingMean:
+    """
+    Streaming equivalent of ``Series.rolling(window).mean()``.
+
+    Reproduces pandas' compensated add/remove updates step for step, so the
+    value after each push is bit-identical to pandas over the same series.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self._values: deque = deque()
+        self._nobs = 0
+        self._sum = 0.0
+        self._neg_count = 0
+        self._comp_add = 0.0
+        self._comp_remove = 0.0
+        self._same_count = 0
+        self._prev: Optional[float] = None
+
+    def copy(self) -> 'RollingMean':
+        clone = copy.copy(self)
+        clone._values = deque(self._values)
+        return clone
+
+    def push(self, value: float) -> float:
+        if self._prev is None:
+            self._prev = value
+        self._values.append(value)
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            if old == old:
+                self._nobs -= 1
+                y = -old - self._comp_remove
+                t = self._sum + y
+                self._comp_remove = t - self._sum - y
+                self._sum = t
+                if math.copysign(1.0, old) < 0:
+                    self._neg_count -= 1
+        if value == value:
+            self._nobs += 1
+            y = value - self._comp_add
+            t = self._sum + y
+            self._comp_add = t - self._sum - y
+            self._sum = t
+            if math.copysign(1.0, value) < 0:
+                self._neg_count += 1
+            self._same_count = self._same_count + 1 if value == self._prev else 1
+            self._prev = value
+
+        if self._nobs < self.window:
+            return np.nan
+        result = self._sum / self._nobs
+        if self._same_count >= self._nobs:
+            result = self._prev
+        elif self._neg_count == 0 and result < 0:
+            result = 0.0
+        elif self._neg_count == self._nobs and result > 0:
+            result = 0.0
+        return result
+
+
+class RollingStd:
+    """Streaming equivalent of ``Series.rolling(window).std()``, bit-identical like RollingMean."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._values: deque = deque()
+        self._nobs = 0
+        self._mean = 0.0
+        self._ssqdm = 0.0
+        self._comp_add = 0.0
+        self._comp_remove = 0.0
+        self._same_count = 0
+        self._prev: Optional[float] = None
+
+    def copy(self) -> 'RollingStd':
+        clone = copy.copy(self)
+        clone._values = deque(self._values)
+        return clone
+
+    def push(self, value: float) -> float:
+        if self._prev is None:
+            self._prev = value
+        self._values.append(value)
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            if old == old:
+                self._nobs -= 1
+                if self._nobs:
+                    prev_mean = self._mean - self._comp_remove
+                    y = old - self._comp_remove
+                    t = y - self._mean
+                    self._comp_remove = t + self._mean - y
+                    self._mean -= t / self._nobs
+                    self._ssqdm -= (old - prev_mean) * (old - self._mean)
+                else:
+                    self._mean = 0.0
+                    self._ssqdm = 0.0
+        if value == value:
+            self._same_count = self._same_count + 1 if value == self._prev else 1
+            self._prev = value
+            self._nobs += 1
+            prev_mean = self._mean - self._comp_add
+            y = value - self._comp_add
+            t = y - self._mean
+            self._comp_add = t + self._mean - y
+            self._mean += t / self._nobs
+            self._ssqdm += (value - prev_mean) * (value - self._mean)
+
+        if self._nobs < self.window or self._nobs <= 1:
+            return np.nan
+        if self._same_count >= self._nobs:
+            return 0.0
+        return math.sqrt(max(self._ssqdm / (self._nobs - 1), 0.0))
+
+
+class StreamingFeatureEngine:
+    """
+    Incremental version of UnifiedLSTMPredictor.create_features() for live cycles.
+
+    Feature rows live in preallocated arrays: one per raw H1 column plus a
+    float64 matrix of the engineered columns.  Each update computes only the
+    newly closed bars and the bar still forming (evaluated on a copy of the
+    rolling state), then refreshes the few values that depend on a forming
+    bar: the forward returns of the last 24 rows and the H4/D1 SMA of rows
+    inside a forming higher-timeframe bar.  frame() returns exactly what
+    create_features() returns over the full history the engine has seen,
+    limited to the last ``capacity`` bars, as a DataFrame over views of
+    those arrays.
+    """
+
+    # Longest look-back/look-ahead of the elementwise features (log_return_1d, fwd_log_return_1d)
+    MARGIN = 24
+    LAGS = [1, 2, 3, 5, 10]
+    # Engineered columns, in create_features() order
+    FEATURE_COLUMNS = ['sma_20_h4', 'sma_20_d1', 'rsi_14_h1', 'hour_sin', 'dow_cos',
+                       'log_return_1h', 'log_return_4h', 'log_return_1d', 'volatility_30',
+                       'fwd_log_return_1h', 'fwd_log_return_4h', 'fwd_log_return_1d'] + \
+                      [f'close_lag_{lag}' for lag in LAGS]
+
+    def __init__(self, capacity: int = 300):
+        self.capacity = capacity
+        self.h1_columns: Optional[List[str]] = None
+        # Rows [_lo, _hi) are closed bars, row _hi is the forming bar.  Twice the
+        # retained rows are allocated so appending only rarely compacts.
+        self._retain = capacity + self.MARGIN
+        self._times: Optional[np.ndarray] = None
+        self._raw: Dict[str, np.ndarray] = {}
+        self._features = np.empty((0, len(self.FEATURE_COLUMNS)))
+        self._col = {name: j for j, name in enumerate(self.FEATURE_COLUMNS)}
+        self._lo = 0
+        self._hi = 0
+        self._prev_close: Optional[float] = None
+        self._gain = RollingMean(14)
+        self._loss = RollingMean(14)
+        self._volatility = RollingStd(30)
+        self._htf = {'H4': RollingMean(20), 'D1': RollingMean(20)}
+        # (time, SMA) of the last closed H4/D1 bar
+        self._htf_last: Dict[str, Optional[Tuple[np.datetime64, float]]] = {'H4': None, 'D1': None}
+        self._last_time: Dict[str, Optional[np.datetime64]] = {'H1': None, 'H4': None, 'D1': None}
+        self._last_close: Dict[str, Optional[float]] = {'H1': None, 'H4': None, 'D1': None}
+
+    def _h1_state(self, close: float, gain: RollingMean, loss: RollingMean,
+                  volatility: RollingStd) -> Tuple[float, float, float]:
+        delta = close - self._prev_close if self._prev_close is not None else np.nan
+        # Same as delta.where(delta > 0, 0) and -delta.where(delta < 0, 0), signed zeros included
+        gain_mean = gain.push(delta if delta > 0 else 0.0)
+        loss_mean = loss.push(-(delta if delta < 0 else 0.0))
+        log_return = np.log(close / self._prev_close) if self._prev_close is not None else np.nan
+        return gain_mean, loss_mean, volatility.push(log_return)
+
+    def _new_bars(self, tf_name: str, times: np.ndarray, closes: np.ndarray) -> Optional[int]:
+        """Position of the first unseen bar, or None if the bars don't continue the committed ones."""
+        last_time = self._last_time[tf_name]
+        if last_time is None:
+            return 0
+        pos = int(np.searchsorted(times, last_time))
+        if pos >= len(times) or times[pos] != last_time or closes[pos] != self._last_close[tf_name]:
+            return None
+        return pos + 1
+
+    def _reserve(self, rows: int) -> None:
+        """Make room for ``rows`` rows from _hi on, moving the retained closed bars to the front if needed."""
+        if self._hi + rows <= len(self._times):
+            return
+        keep = min(self._hi - self._lo, self._retain)
+        size = max(2 * (self._retain + 1), keep + rows)
+        src = slice(self._hi - keep, self._hi)
+        times = np.empty(size, dtype=self._times.dtype)
+        times[:keep] = self._times[src]
+        for col, values in self._raw.items():
+            self._raw[col] = np.empty(size, dtype=values.dtype)
+            self._raw[col][:keep] = values[src]
+        features = np.empty((size, len(self.FEATURE_COLUMNS)), order='F')
+        features[:keep] = self._features[src]
+        self._times, self._features = times, features
+        self._lo, self._hi = 0, keep
+
+    def _shifted_close(self, rows: np.ndarray, shift: int) -> np.ndarray:
+        """close.shift(shift) at the given rows: NaN where the bar is before the first one seen or not there yet."""
+        src = rows - shift
+        ok = (src >= self._lo) & (src <= self._hi)
+        out = np.full(len(rows), np.nan)
+        out[ok] = self._raw['close'][src[ok]]
+        return out
+
+    def update(self, df_h1: pd.DataFrame, df_h4: pd.DataFrame, df_d1: pd.DataFrame) -> Optional[int]:
+        """
+        Advance the state with the bars that closed since the last update.
+
+        Args:
+            df_h1, df_h4, df_d1: Latest bars as returned by download_live_data();
+                the last row of each is treated as still forming
+
+        Returns:
+            Number of newly closed H1 bars, or None if the frames don't continue
+            the bars already seen (gap or broker revision) and the engine
+            needs to be rebuilt
+        """
+        bars = {tf_name: (df.index.to_numpy(), df['close'].to_numpy())
+                for tf_name, df in (('H1', df_h1), ('H4', df_h4), ('D1', df_d1))}
+        starts = {tf_name: self._new_bars(tf_name, *bars[tf_name]) for tf_name in bars}
+        if any(start is None for start in starts.values()):
+            return None
+        if self.h1_columns is None:
+            self.h1_columns = list(df_h1.columns)
+            self._times = np.empty(0, dtype=df_h1.index.dtype)
+            self._raw = {col: np.empty(0, dtype=df_h1[col].to_numpy().dtype) for col in self.h1_columns}
+
+        # Higher timeframes: SMA of each newly closed bar, plus the forming bar on a copy
+        htf_series = {}
+        for tf_name in ('H4', 'D1'):
+            sma = self._htf[tf_name]
+            times, closes = bars[tf_name]
+            last = self._htf_last[tf_name]
+            series = [last] if last is not None else []
+            for i in range(starts[tf_name], len(times) - 1):
+                self._htf_last[tf_name] = (times[i], sma.push(closes[i]))
+                series.append(self._htf_last[tf_name])
+                self._last_time[tf_name], self._last_close[tf_name] = times[i], closes[i]
+            series.append((times[-1], sma.copy().push(closes[-1])))
+            htf_series[tf_name] = (last[0] if last is not None else None,
+                                   np.array([t for t, _ in series]), np.array([v for _, v in series], dtype=np.float64))
+
+        # H1: write the new closed bars over the old forming row, then the forming bar
+        times, closes = bars['H1']
+        first = starts['H1']
+        closed = len(times) - 1 - first
+        self._reserve(closed + 1)
+        old_hi = self._hi
+        new = slice(old_hi, old_hi + closed + 1)
+        self._times[new] = times[first:]
+        for col in self.h1_columns:
+            self._raw[col][new] = closes[first:] if col == 'close' else df_h1[col].to_numpy()[first:]
+
+        states = np.empty((closed + 1, 3))
+        for k, i in enumerate(range(first, len(times) - 1)):
+            states[k] = self._h1_state(closes[i], self._gain, self._loss, self._volatility)
+            self._prev_close = closes[i]
+            self._last_time['H1'], self._last_close['H1'] = times[i], closes[i]
+        states[-1] = self._h1_state(closes[-1], self._gain.copy(), self._loss.copy(), self._volatility.copy())
+        self._hi = old_hi + closed
+
+        # Same expressions as create_features()
+        F, col = self._features, self._col
+        rows = np.arange(new.start, new.stop)
+        close = self._raw['close'][new]
+        gain, loss = states[:, 0], states[:, 1]
+        F[new, col['rsi_14_h1']] = 100 - (100 / (1 + (gain / (loss + 1e-8))))
+        # Hour and weekday (1970-01-01 was a Thursday) straight from the datetime64 values
+        days = times[first:].astype('datetime64[D]')
+        hour = (times[first:] - days) // np.timedelta64(1, 'h')
+        dayofweek = (days.astype(np.int64) + 3) % 7
+        F[new, col['hour_sin']] = np.sin(2 * np.pi * hour / 24)
+        F[new, col['dow_cos']] = np.cos(2 * np.pi * dayofweek / 7)
+        F[new, col['log_return_1h']] = np.log(close / self._shifted_close(rows, 1))
+        F[new, col['log_return_4h']] = np.log(close / self._shifted_close(rows, 4))
+        F[new, col['log_return_1d']] = np.log(close / self._shifted_close(rows, 24))
+        F[new, col['volatility_30']] = states[:, 2]
+        for lag in self.LAGS:
+            F[new, col[f'close_lag_{lag}']] = self._shifted_close(rows, lag)
+
+        # Forward returns reaching the old forming bar or later
+        tail = np.arange(max(self._lo, old_hi - self.MARGIN), self._hi + 1)
+        for horizon, name in ((1, 'fwd_log_return_1h'), (4, 'fwd_log_return_4h'), (24, 'fwd_log_return_1d')):
+            F[tail, col[name]] = np.log(self._shifted_close(tail, -horizon) / self._raw['close'][tail])
+
+        # Higher-timeframe SMA of rows at or after the last bar that was closed before this update
+        retained = self._times[self._lo:self._hi + 1]
+        for tf_name, name in (('H4', 'sma_20_h4'), ('D1', 'sma_20_d1')):
+            refresh_from, series_times, series_values = htf_series[tf_name]
+            start = self._lo
+            if refresh_from is not None:
+                start = min(old_hi, self._lo + int(np.searchsorted(retained, refresh_from, side='left')))
+            pos = np.searchsorted(series_times, self._times[start:self._hi + 1], side='right') - 1
+            F[start:self._hi + 1, col[name]] = np.where(pos >= 0, series_values[np.maximum(pos, 0)], np.nan)
+
+        return closed
+
+    def frame(self) -> pd.DataFrame:
+        """
+        Features of the retained bars, as create_features() would return them.
+
+        The columns are views of the engine's arrays: treat the frame as
+        read-only and don't keep it past the next update().
+        """
+        start = max(self._lo, self._hi + 1 - self.capacity)
+        window = slice(start, self._hi + 1)
+        # dropna(), then inf -> NaN and dropna() again
+        valid = np.isfinite(self._features[window]).all(axis=1)
+        for values in self._raw.values():
+            if values.dtype.kind == 'f':
+                valid &= np.isfinite(values[window])
+        kept = np.flatnonzero(valid)
+        if len(kept) == 0:
+            rows = slice(start, start)
+        elif kept[-1] - kept[0] + 1 == len(kept):
+            rows = slice(start + kept[0], start + kept[-1] + 1)
+        else:
+            rows = start + kept
+
+        data = {col: self._raw[col][rows] for col in self.h1_columns}
+        for name, j in self._col.items():
+            data[name] = self._features[rows, j]
+        return pd.DataFrame(data, index=pd.DatetimeIndex(self._times[rows], name='time'), copy=False)
+
+
+class MarketDataSource(ABC):
+    """
+    Where bars come from.
+
+    Mirrors the MetaTrader5 calls the predictor uses, with timeframes given
+    as 'H1', 'H4' or 'D1'.  Rate arrays use the MT5 structured layout
+    (RATES_DTYPE) with 'time' in epoch seconds.
+    """
+
+    def initialize(self) -> bool:
+        return True
+
+    def shutdown(self) -> None:
+        pass
+
+    def describe(self) -> str:
+        return self.__class__.__name__
+
+    @abstractmethod
+    def symbol_select(self, symbol: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def copy_rates_from(self, symbol: str, timeframe: str, date_from: datetime,
+                        count: int) -> Optional[np.ndarray]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def copy_rates_from_pos(self, symbol: str, timeframe: str, start_pos: int,
+                            count: int) -> Optional[np.ndarray]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def copy_rates_range(self, symbol: str, timeframe: str, date_from: datetime,
+                         date_to: datetime) -> Optional[np.ndarray]:
+        raise NotImplementedError
+
+
+class MT5DataSource(MarketDataSource):
+    """
+    Live bars from the MetaTrader 5 terminal.
+
+    The MetaTrader5 package keeps one global terminal session that is not
+    thread-safe, so calls are serialised when several predictors share it.
+    """
+
+    def __init__(self):
+        self.timeframes = {'H1': mt5.TIMEFRAME_H1, 'H4': mt5.TIMEFRAME_H4,
+                           'D1': mt5.TIMEFRAME_D1} if mt5 is not None else {}
+        self._lock = threading.Lock()
+
+    def initialize(self) -> bool:
+        if mt5 is None:
+            print("MetaTrader5 package is not available on this platform (use --data-dir for offline data)")
+            return False
+        return mt5.initialize()
+
+    def shutdown(self) -> None:
+        if mt5 is not None:
+            mt5.shutdown()
+
+    def describe(self) -> str:
+        return f"MT5: {mt5.account_info().login}"
+
+    def symbol_select(self, symbol: str) -> bool:
+        with self._lock:
+            return mt5.symbol_select(symbol, True)
+
+    def copy_rates_from(self, symbol: str, timeframe: str, date_from: datetime,
+                        count: int) -> Optional[np.ndarray]:
+        with self._lock:
+            return mt5.copy_rates_from(symbol, self.timeframes[timeframe], date_from, count)
+
+    def copy_rates_from_pos(self, symbol: str, timeframe: str, start_pos: int,
+                            count: int) -> Optional[np.ndarray]:
+        with self._lock:
+            return mt5.copy_rates_from_pos(symbol, self.timeframes[timeframe], start_pos, count)
+
+    def copy_rates_range(self, symbol: str, timeframe: str, date_from: datetime,
+                         date_to: datetime) -> Optional[np.ndarray]:
+        with self._lock:
+            return mt5.copy_rates_range(symbol, self.timeframes[timeframe], date_from, date_to)
+
+
+class FileDataSource(MarketDataSource):
+    """
+    Offline bars from a local archive, so training and backtests run without a terminal.
+
+    The archive holds one file per symbol and timeframe: ``{SYMBOL}_{TF}.npy``
+    in the bar cache layout (a bar_cache directory can be copied over as is),
+    or ``{SYMBOL}_{TF}.csv`` with a 'time' column (epoch seconds or dates)
+    and open/high/low/close/tick_volume columns.  Naive datetimes are UTC.
+    """
+
+    def __init__(self, archive_dir: str):
+        self.archive_dir = archive_dir
+        self._rates: Dict[Tuple[str, str], Optional[np.ndarray]] = {}
+
+    def initialize(self) -> bool:
+        if not os.path.isdir(self.archive_dir):
+            print(f"Bar archive directory not found: {self.archive_dir}")
+            return False
+        return True
+
+    def describe(self) -> str:
+        return f"bar archive {self.archive_dir}"
+
+    def _load(self, symbol: str, timeframe: str) -> Optional[np.ndarray]:
+        key = (symbol, timeframe)
+        if key not in self._rates:
+            stem = os.path.join(self.archive_dir, f"{symbol}_{timeframe}")
+            rates = None
+            if os.path.exists(stem + '.npy'):
+                rates = np.load(stem + '.npy')
+            elif os.path.exists(stem + '.csv'):
+                df = pd.read_csv(stem + '.csv')
+                times = df['time']
+                if not pd.api.types.is_numeric_dtype(times):
+                    times = (pd.to_datetime(times) - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+                rates = np.zeros(len(df), dtype=RATES_DTYPE)
+                rates['time'] = times
+                for col in RATES_DTYPE.names[1:]:
+                    if col in df.columns:
+                        rates[col] = df[col]
+                rates = rates[np.argsort(rates['time'], kind='stable')]
+            self._rates[key] = rates
+        return self._rates[key]
+
+    @staticmethod
+    def _epoch(moment: datetime) -> int:
+        return int(pd.Timestamp(moment).timestamp())
+
+    def symbol_select(self, symbol: str) -> bool:
+        return any(os.path.exists(os.path.join(self.archive_dir, f"{symbol}_H1{ext}")) for ext in ('.npy', '.csv'))
+
+    def copy_rates_from(self, symbol: str, timeframe: str, date_from: datetime,
+                        count: int) -> Optional[np.ndarray]:
+        rates = self._load(symbol, timeframe)
+        if rates is None:
+            return None
+        # Like MT5: the `count` bars opening at or before date_from
+        end = np.searchsorted(rates['time'], self._epoch(date_from), side='right')
+        return rates[max(0, end - count):end]
+
+    def copy_rates_from_pos(self, symbol: str, timeframe: str, start_pos: int,
+                            count: int) -> Optional[np.ndarray]:
+        rates = self._load(symbol, timeframe)
+        if rates is None:
+            return None
+        # Position 0 is the newest bar
+        end = len(rates) - start_pos
+        return rates[max(0, end - count):max(0, end)]
+
+    def copy_rates_range(self, symbol: str, timeframe: str, date_from: datetime,
+                         date_to: datetime) -> Optional[np.ndarray]:
+        rates = self._load(symbol, timeframe)
+        if rates is None:
+            return None
+        times = rates['time']
+        return rates[np.searchsorted(times, self._epoch(date_from), side='left'):
+                     np.searchsorted(times, self._epoch(date_to), side='right')]
+
+
+_CUSTOM_LAYERS: Dict[str, type] = {}
+_CUSTOM_LAYERS_LOCK = threading.Lock()
+
+
+def custom_layers() -> Dict[str, type]:
+    """
+    Define and register the custom Keras layers on first use.
+
+    They subclass keras.layers.Layer, so defining them at import time would
+    import TensorFlow.  The dict doubles as ``custom_objects`` for load_model().
+    Guarded by a lock because Keras refuses to register the same name twice.
+    """
+    if not _CUSTOM_LAYERS:
+        with _CUSTOM_LAYERS_LOCK:
+            if not _CUSTOM_LAYERS:
+                _CUSTOM_LAYERS.update(_define_custom_layers())
+    return _CUSTOM_LAYERS
+
+
+def _define_custom_layers() -> Dict[str, type]:
+    """Build and register the custom layer classes; only custom_layers() calls this."""
+    @keras.saving.register_keras_serializable(package="Custom", name="TransformerBlock")
+    class TransformerBlock(layers.Layer):
+        def __init__(self, embed_dim: int, num_heads: int, ff_dim: int, rate: float = 0.1, **kwargs):
+            super(TransformerBlock, self).__init__(**kwargs)
+            self.embed_dim = embed_dim
+            self.num_heads = num_heads
+            self.ff_dim = ff_dim
+            self.rate = rate
+            self.att = layers.MultiHeadAttention(num_heads=num_heads, key_dim=embed_dim)
+            self.ffn = tf.keras.Sequential([
+                layers.Dense(ff_dim, activation="relu"),
+                layers.Dense(embed_dim)
+            ])
+            self.layernorm1 = layers.LayerNormalization(epsilon=1e-6)
+            self.layernorm2 = layers.LayerNormalization(epsilon=1e-6)
+            self.dropout1 = layers.Dropout(rate)
+            self.dropout2 = layers.Dropout(rate)
+
+        def call(self, inputs, training=False):
+            attn_output = self.att(inputs, inputs)
+            attn_output = self.dropout1(attn_output, training=training)
+            out1 = self.layernorm1(inputs + attn_output)
+            ffn_output = self.ffn(out1)
+            ffn_output = self.dropout2(ffn_output, training=training)
+            return self.layernorm2(out1 + ffn_output)
+
+        def get_config(self):
+            config = super().get_config()
+            config.update({
+                'embed_dim': self.embed_dim,
+                'num_heads': self.num_heads,
+                'ff_dim': self.ff_dim,
+                'rate': self.rate
+            })
+            return config
+
+        @classmethod
+        def from_config(cls, config):
+            return cls(**config)
+
+
+    @keras.saving.register_keras_serializable(package="Custom", name="AttentionLayer")
+    class AttentionLayer(layers.Layer):
+        """Simple attention mechanism for LSTM outputs."""
+
+        def __init__(self, **kwargs):
+            super(AttentionLayer, self).__init__(**kwargs)
+
+        def build(self, input_shape):
+            self.W = self.add_weight(
+                name='attention_weight',
+                shape=(input_shape[-1], input_shape[-1]),
+                initializer='glorot_uniform',
+                trainable=True
+            )
+            self.b = self.add_weight(
+                name='attention_bias',
+                shape=(input_shape[-1],),
+                initializer='zeros',
+                trainable=True
+            )
+            self.u = self.add_weight(
+                name='attention_context',
+                shape=(input_shape[-1],),
+                initializer='glorot_uniform',
+                trainable=True
+            )
+            super(AttentionLayer, self).build(input_shape)
+
+        def call(self, inputs):
+            # inputs shape: (batch, timesteps, features)
+            score = tf.nn.tanh(tf.tensordot(inputs, self.W, axes=1) + self.b)
+            attention_weights = tf.nn.softmax(tf.tensordot(score, self.u, axes=1), axis=1)
+            context_vector = tf.reduce_sum(inputs * tf.expand_dims(attention_weights, -1), axis=1)
+            return context_vector
+
+        def get_config(self):
+            return super().get_config()
 
-    def call(self, inputs):
-        # inputs shape: (batch, timesteps, features)
-        score = tf.nn.tanh(tf.tensordot(inputs, self.W, axes=1) + self.b)
-        attention_weights = tf.nn.softmax(tf.tensordot(score, self.u, axes=1), axis=1)
-        context_vector = tf.reduce_sum(inputs * tf.expand_dims(attention_weights, -1), axis=1)
-        return context_vector
+        @classmethod
+        def from_config(cls, config):
+            return cls(**config)
 
-    def get_config(self):
-        return super().get_config()
-    
-    @classmethod
-    def from_config(cls, config):
-        return cls(**config)
+    return {'TransformerBlock': TransformerBlock, 'AttentionLayer': AttentionLayer}
 
 
 # --- Main Predictor Class ---
@@ -203,7 +1372,18 @@ class UnifiedLSTMPredictor:
                  train_start: Optional[str] = None,
                  train_end:   Optional[str] = None,
                  predict_start: Optional[str] = None,
-                 predict_end:   Optional[str] = None):
+                 predict_end:   Optional[str] = None,
+                 lazy_windows: bool = False,
+                 multi_head: bool = False,
+                 train_workers: int = 1,
+                 intra_op_threads: Optional[int] = None,
+                 inter_op_threads: Optional[int] = None,
+                 use_bar_cache: bool = True,
+                 data_source: Optional[MarketDataSource] = None,
+                 connect_mt5: bool = True,
+                 binary_output: bool = False,
+                 export_tflite: bool = True,
+                 prefer_tflite: bool = False):
         self.symbol = symbol.upper()
         # --- NEW MACRO SYMBOLS ---
         self.dxy_symbol = "USDX"
@@ -216,6 +1396,14 @@ class UnifiedLSTMPredictor:
         self.base_path = self.get_mt5_files_path()
         self.use_kalman = use_kalman
         self.use_multitimeframe = use_multitimeframe
+        # Stream training windows through tf.data instead of materialising them
+        self.lazy_windows = lazy_windows
+        # Train one multi-head DL model per ensemble member instead of one per timeframe
+        self.multi_head = multi_head
+        # Ensemble members trained concurrently, and TF threads per worker (None = auto)
+        self.train_workers = max(1, train_workers)
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
 
         # --- DATE RANGE FILTERS ---
         # Parse ISO date strings (YYYY-MM-DD) into datetime objects when provided
@@ -242,14 +1430,24 @@ class UnifiedLSTMPredictor:
 
         # File paths
         self.predictions_file = os.path.join(self.base_path, f"{self.symbol}_predictions_multitf.json")
+        self.binary_predictions_file = os.path.join(self.base_path, f"{self.symbol}_predictions.bin")
         self.status_file = os.path.join(self.base_path, f"lstm_status_{self.symbol}.json")
         self.feature_scaler_path = os.path.join(self.base_path, f"feature_scaler_{self.symbol}.pkl")
         self.target_scaler_path = os.path.join(self.base_path, f"target_scaler_{self.symbol}.pkl")
         self.selected_features_path = os.path.join(self.base_path, f"selected_features_{self.symbol}.json")
         self.pending_eval_path = os.path.join(self.base_path, f"pending_evaluations_{self.symbol}.json")
+        self.evaluation_store_path = os.path.join(self.base_path, f"evaluations_{self.symbol}.sqlite")
+        self.ensemble_state_path = os.path.join(self.base_path, f"ensemble_state_{self.symbol}.json")
+        self.scheduler_metrics_path = os.path.join(self.base_path, f"scheduler_metrics_{self.symbol}.jsonl")
         self.tuner_dir = os.path.join(self.base_path, 'tuner_results')
         # Manifest records exact train window so backtest generation can verify no overlap
         self.cutoff_manifest_path = os.path.join(self.base_path, f"training_cutoff_{self.symbol}.json")
+        # Bars come from the MT5 terminal unless an offline source is supplied
+        self.data_source = data_source or MT5DataSource()
+        # Local OHLC store so each mode only downloads bars it hasn't seen yet
+        # (an offline archive is already local)
+        use_bar_cache = use_bar_cache and isinstance(self.data_source, MT5DataSource)
+        self.bar_cache = BarCache(os.path.join(self.base_path, 'bar_cache'), self.symbol) if use_bar_cache else None
 
         self.target_column = 'fwd_log_return_1h'
         self.feature_cols: Optional[List[str]] = None
@@ -269,17 +1467,35 @@ class UnifiedLSTMPredictor:
 
         self.previous_predictions = {tf: None for tf in self.kalman_config.keys()}
         self.ema_alpha = 0.3
-        # Only set ensemble_weights if we have models, otherwise set empty (will be set in load_model_assets)
-        if self.num_ensemble_models > 0:
-            self.ensemble_weights = [1.0 / self.num_ensemble_models] * self.num_ensemble_models
-        else:
-            self.ensemble_weights = []
-        self.prediction_history = {tf: [] for tf in self.kalman_config.keys()}
         self.ensemble_lookback = 20
         self.ensemble_learning_rate = 0.1
-
-        self.initialize_mt5()
-        self.ensure_symbols_selected()
+        # Per-timeframe ensemble weights (re-sized in load_model_assets if models are auto-detected)
+        self.ensemble_scorer = EnsembleScorer(list(self.kalman_config.keys()), self.num_ensemble_models,
+                                              window=self.ensemble_lookback,
+                                              learning_rate=self.ensemble_learning_rate)
+        self.last_fetch_latency: Dict[str, float] = {}
+        # Pending evaluations; picks up entries left in the old JSON file
+        self.evaluation_store = EvaluationStore(self.evaluation_store_path)
+        migrated = self.evaluation_store.import_json(self.pending_eval_path)
+        if migrated:
+            print(f"Migrated {migrated} pending evaluations to {os.path.basename(self.evaluation_store_path)}")
+        # (df_dxy, df_spx) fetched once per cycle by MultiSymbolRunner for every symbol
+        self.shared_macro: Optional[Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]] = None
+        self.feature_engine: Optional[StreamingFeatureEngine] = None
+        # Also publish {symbol}_predictions.bin for the EA's binary reader
+        self.binary_output = binary_output
+        self.output_sequence: Optional[int] = None
+        # Convert trained DL models to TFLite after training.  Only live serving prefers those
+        # exports over the .keras files: they run one window at a time, too slow for backtests.
+        self.export_tflite = export_tflite
+        self.prefer_tflite = prefer_tflite
+        # Whether a loaded Keras model needs the lookback window as a tensor (see _sequence_input)
+        self.tensor_inputs = any(model_type != 'lgbm' for model_type in self.ensemble_model_types)
+
+        # Worker processes get their data from the parent and skip the data source
+        if connect_mt5:
+            self.initialize_mt5()
+            self.ensure_symbols_selected()
 
     def get_mt5_files_path(self) -> str:
         mt5_path = get_config_mt5_path()
@@ -288,14 +1504,14 @@ class UnifiedLSTMPredictor:
         return mt5_path
 
     def initialize_mt5(self) -> None:
-        if not mt5.initialize():
+        if not self.data_source.initialize():
             sys.exit(1)
-        print(f"Connected to MT5: {mt5.account_info().login}")
+        print(f"Connected to {self.data_source.describe()}")
 
     def ensure_symbols_selected(self):
         """Ensures DXY and SP500 are in Market Watch."""
         for s in [self.symbol, self.dxy_symbol, self.spx_symbol] + self.related_symbols:
-            mt5.symbol_select(s, True)
+            self.data_source.symbol_select(s)
 
     def _download_macro_data(self, bars: int = 300) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]:
         """
@@ -309,8 +1525,8 @@ class UnifiedLSTMPredictor:
         dxy_symbols = [self.dxy_symbol, "USDX", "DXY", "DX", "US Dollar Index"]
         for sym in dxy_symbols:
             try:
-                mt5.symbol_select(sym, True)
-                data = mt5.copy_rates_from_pos(sym, mt5.TIMEFRAME_H1, 0, bars)
+                self.data_source.symbol_select(sym)
+                data = self.data_source.copy_rates_from_pos(sym, 'H1', 0, bars)
                 if data is not None and len(data) > 0:
                     df_dxy = pd.DataFrame(data)
                     df_dxy['time'] = pd.to_datetime(df_dxy['time'], unit='s')
@@ -324,8 +1540,8 @@ class UnifiedLSTMPredictor:
         spx_symbols = [self.spx_symbol, "SPX500", "SP500", "US500", "SPX", "S&P500", "US500.cash"]
         for sym in spx_symbols:
             try:
-                mt5.symbol_select(sym, True)
-                data = mt5.copy_rates_from_pos(sym, mt5.TIMEFRAME_H1, 0, bars)
+                self.data_source.symbol_select(sym)
+                data = self.data_source.copy_rates_from_pos(sym, 'H1', 0, bars)
                 if data is not None and len(data) > 0:
                     df_spx = pd.DataFrame(data)
                     df_spx['time'] = pd.to_datetime(df_spx['time'], unit='s')
@@ -432,25 +1648,36 @@ class UnifiedLSTMPredictor:
         Returns:
             Tuple of (df_h1, df_h4, df_d1) DataFrames
         """
-        if date_from or date_to:
+        if self.bar_cache is not None:
+            _from = (date_from or datetime(2000, 1, 1)) if (date_from or date_to) else None
+            _to = (date_to or datetime.utcnow()) if (date_from or date_to) else None
+            print(f"Loading multi-timeframe data for {self.symbol} from bar cache...")
+            try:
+                raw_h1 = self._load_cached_rates('H1', bars, _from, _to)
+                raw_h4 = self._load_cached_rates('H4', bars // 4, _from, _to)
+                raw_d1 = self._load_cached_rates('D1', bars // 20, _from, _to)
+            except Exception as e:
+                print(f"Error updating bar cache: {e}")
+                return None, None, None
+        elif date_from or date_to:
             # Resolve defaults so copy_rates_range always gets explicit bounds
             _from = date_from or datetime(2000, 1, 1)
             _to   = date_to   or datetime.utcnow()
             range_str = f"{_from.strftime('%Y-%m-%d')} to {_to.strftime('%Y-%m-%d')}"
             print(f"Downloading multi-timeframe data for {self.symbol} [{range_str}]...")
             try:
-                raw_h1 = mt5.copy_rates_range(self.symbol, mt5.TIMEFRAME_H1, _from, _to)
-                raw_h4 = mt5.copy_rates_range(self.symbol, mt5.TIMEFRAME_H4, _from, _to)
-                raw_d1 = mt5.copy_rates_range(self.symbol, mt5.TIMEFRAME_D1, _from, _to)
+                raw_h1 = self.data_source.copy_rates_range(self.symbol, 'H1', _from, _to)
+                raw_h4 = self.data_source.copy_rates_range(self.symbol, 'H4', _from, _to)
+                raw_d1 = self.data_source.copy_rates_range(self.symbol, 'D1', _from, _to)
             except Exception as e:
                 print(f"Error downloading data by range: {e}")
                 return None, None, None
         else:
             print(f"Downloading multi-timeframe data for {self.symbol} (last {bars} bars)...")
             try:
-                raw_h1 = mt5.copy_rates_from_pos(self.symbol, mt5.TIMEFRAME_H1, 0, bars)
-                raw_h4 = mt5.copy_rates_from_pos(self.symbol, mt5.TIMEFRAME_H4, 0, bars // 4)
-                raw_d1 = mt5.copy_rates_from_pos(self.symbol, mt5.TIMEFRAME_D1, 0, bars // 20)
+                raw_h1 = self.data_source.copy_rates_from_pos(self.symbol, 'H1', 0, bars)
+                raw_h4 = self.data_source.copy_rates_from_pos(self.symbol, 'H4', 0, bars // 4)
+                raw_d1 = self.data_source.copy_rates_from_pos(self.symbol, 'D1', 0, bars // 20)
             except Exception as e:
                 print(f"Error downloading data: {e}")
                 return None, None, None
@@ -478,6 +1705,122 @@ class UnifiedLSTMPredictor:
             print(f"Error processing downloaded data: {e}")
             return None, None, None
 
+    def download_live_data(self, bars: int = 300) -> Tuple[Optional[pd.DataFrame], ...]:
+        """
+        Fetch the latest bars of every timeframe, plus macro data, once per live cycle.
+
+        Fetch latency per source is printed and kept in self.last_fetch_latency
+        (milliseconds) so the delay between bar close and publishing is visible.
+
+        Args:
+            bars: Number of most recent bars per timeframe
+
+        Returns:
+            Tuple of (df_h1, df_h4, df_d1, df_dxy, df_spx); all None if a
+            timeframe has too few bars, macro frames None when unavailable
+        """
+        latency: Dict[str, float] = {}
+        frames = []
+        for name in ('H1', 'H4', 'D1'):
+            start = time.perf_counter()
+            df = pd.DataFrame(self.data_source.copy_rates_from_pos(self.symbol, name, 0, bars))
+            latency[name] = (time.perf_counter() - start) * 1000
+            if df.empty or len(df) < 100:
+                print(f"ERROR: Insufficient {name} data for prediction")
+                return None, None, None, None, None
+            df['time'] = pd.to_datetime(df['time'], unit='s')
+            df.set_index('time', inplace=True)
+            df.rename(columns={'tick_volume': 'volume'}, inplace=True)
+            frames.append(df)
+
+        # Download macro data safely, unless a multi-symbol runner already fetched it
+        if self.shared_macro is not None:
+            df_dxy, df_spx = self.shared_macro
+        else:
+            start = time.perf_counter()
+            df_dxy, df_spx = self._download_macro_data(bars)
+            latency['macro'] = (time.perf_counter() - start) * 1000
+
+        self.last_fetch_latency = latency
+        print("   Fetch latency: " + ", ".join(f"{name} {ms:.0f}ms" for name, ms in latency.items())
+              + f" (total {sum(latency.values()):.0f}ms)")
+        return frames[0], frames[1], frames[2], df_dxy, df_spx
+
+    def _load_cached_rates(self, tf_name: str, bars: int,
+                           date_from: Optional[datetime], date_to: Optional[datetime]) -> Optional[np.ndarray]:
+        """
+        Serve one timeframe from the bar cache, downloading only what is missing.
+
+        A warm cache is topped up with the bars after its tail (plus a short
+        overlap to pick up broker revisions).  Full history is downloaded only
+        for a cold cache, a gap at the seam, or a request reaching further back
+        than anything requested before.
+
+        Args:
+            tf_name: 'H1', 'H4' or 'D1'
+            bars: Number of most recent bars (used when no date range is given)
+            date_from: Inclusive start of a date range, or None
+            date_to: Inclusive end of a date range, or None
+
+        Returns:
+            MT5 rate array covering the request, or None if nothing could be fetched
+        """
+        start = time.time()
+        rates, meta = self.bar_cache.load(tf_name)
+        cached, cached_meta = rates, dict(meta)
+        horizon = datetime.now(timezone.utc) + timedelta(days=1)
+        from_ts = int(pd.Timestamp(date_from).timestamp()) if date_from is not None else None
+        fetched = revised = 0
+
+        if rates is None:
+            needs_history = True
+        elif from_ts is not None:
+            needs_history = from_ts < rates['time'][0] and from_ts < meta.get('requested_from', np.inf)
+        else:
+            needs_history = len(rates) < bars and bars > meta.get('requested_bars', 0)
+
+        if not needs_history:
+            tail = int(rates['time'][-1])
+            top_up_from = datetime.fromtimestamp(tail - BarCache.OVERLAP_BARS * BarCache.BAR_SECONDS[tf_name],
+                                                 tz=timezone.utc)
+            fresh = self.data_source.copy_rates_range(self.symbol, tf_name, top_up_from, horizon)
+            if fresh is None or len(fresh) == 0:
+                print(f"   {tf_name}: no bars returned for top-up, using cached bars as they are")
+            elif fresh['time'][0] > tail:
+                print(f"   {tf_name}: gap between cache tail and broker history, re-downloading")
+                rates, meta = None, {}
+            else:
+                rates, revised = BarCache.merge(rates, fresh)
+                fetched = int((fresh['time'] > tail).sum())
+
+        if rates is None or needs_history:
+            if from_ts is not None:
+                fresh = self.data_source.copy_rates_range(self.symbol, tf_name, date_from, horizon)
+                meta['requested_from'] = min(meta.get('requested_from', from_ts), from_ts)
+            else:
+                fresh = self.data_source.copy_rates_from_pos(self.symbol, tf_name, 0, bars)
+                meta['requested_bars'] = max(meta.get('requested_bars', 0), bars)
+            if fresh is not None and len(fresh) > 0:
+                fetched = len(fresh)
+                if rates is None:
+                    rates = fresh
+                else:
+                    rates, revised = BarCache.merge(rates, fresh)
+            elif rates is None:
+                return None
+
+        if not BarCache.unchanged(cached, cached_meta, rates, meta):
+            self.bar_cache.save(tf_name, rates, meta)
+        if revised:
+            print(f"   {tf_name}: broker revised {revised} cached bar(s), cache corrected")
+        print(f"   {tf_name}: {fetched} bar(s) downloaded, {len(rates)} cached ({time.time() - start:.2f}s)")
+
+        if from_ts is None:
+            return rates[-bars:]
+        to_ts = int(pd.Timestamp(date_to).timestamp())
+        times = rates['time']
+        return rates[np.searchsorted(times, from_ts, side='left'):np.searchsorted(times, to_ts, side='right')]
+
     def create_features(self, df_h1: pd.DataFrame, df_h4: pd.DataFrame, df_d1: pd.DataFrame) -> pd.DataFrame:
         """
         Create advanced features for model training.
@@ -537,6 +1880,86 @@ class UnifiedLSTMPredictor:
         print(f"   Created {len(df.columns)} features from {len(df)} bars")
         return df
 
+    def _sequence_input(self, X: np.ndarray) -> Any:
+        """
+        Convert a lookback window for the deep-learning models.
+
+        LightGBM-only ensembles and TFLite-served models take the array as-is,
+        so TensorFlow is only imported when a Keras model is loaded.
+        """
+        if not self.tensor_inputs:
+            return X
+        return tf.convert_to_tensor(X, dtype=tf.float32)
+
+    def _live_features(self, df_h1: pd.DataFrame, df_h4: pd.DataFrame, df_d1: pd.DataFrame) -> pd.DataFrame:
+        """
+        Live-cycle replacement for create_features() backed by the streaming engine.
+
+        The engine is (re)built from the frames on the first cycle and whenever
+        they don't continue the bars it has seen; otherwise only newly closed
+        bars are processed.
+        """
+        new_bars = self.feature_engine.update(df_h1, df_h4, df_d1) if self.feature_engine is not None else None
+        if new_bars is None:
+            self.feature_engine = StreamingFeatureEngine(capacity=len(df_h1))
+            self.feature_engine.update(df_h1, df_h4, df_d1)
+            print(f"Feature engine initialised from {len(df_h1)} bars")
+        else:
+            print(f"Feature engine updated with {new_bars} closed bar(s)")
+        return self.feature_engine.frame()
+
+    def check_feature_parity(self, bars: int = 3000, window: int = 300, step: int = 1) -> bool:
+        """
+        Replay history through StreamingFeatureEngine and compare it with create_features().
+
+        Each step feeds the engine the last ``window`` bars up to that point, as
+        a live cycle would, and requires its frame to match create_features()
+        over the same history bit for bit.
+
+        Args:
+            bars: H1 history to replay
+            window: Bars per simulated live fetch
+            step: Bars between simulated cycles
+
+        Returns:
+            True if every compared frame was identical
+        """
+        print(f"Checking streaming feature parity over {bars} H1 bars...")
+        df_h1, df_h4, df_d1 = self.download_data(bars)
+        if df_h1 is None:
+            return False
+
+        engine = StreamingFeatureEngine(capacity=window)
+        mismatches = 0
+        checks = 0
+        start = time.time()
+        for end in range(window, len(df_h1) + 1, step):
+            now = df_h1.index[end - 1]
+            h4_end = df_h4.index.searchsorted(now, side='right')
+            d1_end = df_d1.index.searchsorted(now, side='right')
+            if engine.update(df_h1.iloc[max(0, end - window):end], df_h4.iloc[max(0, h4_end - window):h4_end],
+                             df_d1.iloc[max(0, d1_end - window):d1_end]) is None:
+                print(f"   {now}: bars don't continue the previous window")
+                return False
+            got = engine.frame()
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                expected = self.create_features(df_h1.iloc[:end], df_h4.iloc[:h4_end], df_d1.iloc[:d1_end])
+            expected = expected[expected.index >= got.index[0]] if len(got) else expected.iloc[:0]
+
+            checks += 1
+            identical = (got.index.equals(expected.index) and list(got.columns) == list(expected.columns)
+                         and all(got[col].dtype == expected[col].dtype
+                                 and np.array_equal(got[col].values, expected[col].values, equal_nan=True)
+                                 for col in got.columns))
+            if not identical:
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"   MISMATCH at {now}")
+
+        print(f"   {checks - mismatches}/{checks} frames identical ({time.time() - start:.1f}s)")
+        return mismatches == 0
+
     def perform_feature_selection(self, df: pd.DataFrame, num_features: int = 25) -> pd.DataFrame:
         """
         Select most important features using LightGBM.
@@ -597,47 +2020,161 @@ class UnifiedLSTMPredictor:
         Returns:
             Tuple of (X_train, y_train, X_val, y_val)
         """
-        target_col = self.target_column
+        seq_data = self._prepare_sequential_features(df)
+        X_train, y_train, train_idx, X_val, y_val = self._prepare_sequential_targets(seq_data, self.target_column)
+        return X_train[train_idx], y_train[train_idx], X_val, y_val
+
+    def _prepare_sequential_features(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Scale features and build lookback windows once, independent of the target.
+
+        Fits self.feature_scaler on the training split.  The returned windows
+        are strided views and can be shared by every prediction horizon.
+
+        Args:
+            df: DataFrame with features and all target columns
+
+        Returns:
+            Dict with 'train_df', 'val_df', the scaled 'train_features' and
+            'val_features' matrices, and their windows 'X_train' and 'X_val'
+        """
         train_size = int(len(df) * 0.70)
         val_size = int(len(df) * 0.15)
 
         train_df = df[:train_size]
         val_df = df[train_size:train_size + val_size]
 
-        print(f"   Target stats - Mean: {train_df[target_col].mean():.6f}, Std: {train_df[target_col].std():.6f}")
+        self.feature_scaler = RobustScaler()
+
+        # Scale features (float32 is what Keras trains on anyway)
+        train_scaled_features = self.feature_scaler.fit_transform(train_df[self.feature_cols]).astype(np.float32)
+        val_scaled_features = self.feature_scaler.transform(val_df[self.feature_cols]).astype(np.float32)
+
+        X_train = self._create_windows(train_scaled_features)
+        X_val = self._create_windows(val_scaled_features)
+
+        print(f"   Prepared sequential data: X_train shape {X_train.shape}")
+        return {'train_df': train_df, 'val_df': val_df,
+                'train_features': train_scaled_features, 'val_features': val_scaled_features,
+                'X_train': X_train, 'X_val': X_val}
+
+    def _prepare_sequential_targets(self, seq_data: Dict[str, Any], target_col: str
+                                    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Filter outliers and scale one target on top of shared feature windows.
+
+        Fits self.target_scaler.  Training samples whose target is more than
+        5 std devs from the mean are excluded through ``train_idx`` rather
+        than by copying the windows.
+
+        Args:
+            seq_data: Output of _prepare_sequential_features()
+            target_col: Target column to predict
+
+        Returns:
+            Tuple of (X_train, y_train, train_idx, X_val, y_val); X_train/y_train
+            cover every window and train_idx selects the samples to train on
+        """
+        train_df, val_df = seq_data['train_df'], seq_data['val_df']
+        train_target = train_df[target_col]
+
+        print(f"   Target stats - Mean: {train_target.mean():.6f}, Std: {train_target.std():.6f}")
 
         # Remove extreme outliers (more than 5 std devs)
-        mean_return = train_df[target_col].mean()
-        std_return = train_df[target_col].std()
-        train_df = train_df[abs(train_df[target_col] - mean_return) < (5 * std_return)]
-        print(f"   Removed {train_size - len(train_df)} outliers from training data")
+        mean_return = train_target.mean()
+        std_return = train_target.std()
+        keep_rows = (abs(train_target - mean_return) < (5 * std_return)).values
+        print(f"   Removed {len(keep_rows) - int(keep_rows.sum())} outliers from training data")
 
-        # Initialize scalers
-        self.feature_scaler = RobustScaler()
         self.target_scaler = RobustScaler()
+        self.target_scaler.fit(train_df[[target_col]][keep_rows])
+        print(f"   Target scaler - Center: {self.target_scaler.center_[0]:.6f}, Scale: {self.target_scaler.scale_[0]:.6f}")
 
-        # Scale features and target
-        train_scaled_features = self.feature_scaler.fit_transform(train_df[self.feature_cols])
-        train_scaled_target = self.target_scaler.fit_transform(train_df[[target_col]])
+        # Target for window k is the row right after it
+        y_train = self.target_scaler.transform(train_df[[target_col]])[self.lookback_periods:]
+        y_val = self.target_scaler.transform(val_df[[target_col]])[self.lookback_periods:]
+        train_idx = np.flatnonzero(keep_rows[self.lookback_periods:])
 
-        val_scaled_features = self.feature_scaler.transform(val_df[self.feature_cols])
-        val_scaled_target = self.target_scaler.transform(val_df[[target_col]])
+        return seq_data['X_train'], y_train, train_idx, seq_data['X_val'], y_val
 
-        print(f"   Target scaler - Center: {self.target_scaler.center_[0]:.6f}, Scale: {self.target_scaler.scale_[0]:.6f}")
+    def _create_windows(self, features: np.ndarray) -> np.ndarray:
+        """
+        Create input windows for time series prediction without copying.
+
+        ``X[k]`` is ``features[k:k + lookback]``, i.e. the input for the target at
+        row ``k + lookback``.  X is a strided view over ``features``, so it costs
+        no memory until a batch of it is materialised.
+        """
+        n = len(features) - self.lookback_periods
+        if n <= 0:
+            return np.empty((0, self.lookback_periods, features.shape[1]), dtype=features.dtype)
+        return self._build_lookback_windows(features)[:n]
 
-        def create_sequences(features: np.ndarray, target: np.ndarray, lookback: int) -> Tuple[np.ndarray, np.ndarray]:
-            """Create sequences for time series prediction."""
-            X, y = [], []
-            for i in range(lookback, len(features)):
-                X.append(features[i - lookback:i])
-                y.append(target[i])
-            return np.array(X), np.array(y)
+    def _make_window_dataset(self, X_windows: np.ndarray, y: np.ndarray, batch_size: int, shuffle: bool,
+                             sample_idx: Optional[np.ndarray] = None) -> 'tf.data.Dataset':
+        """
+        Build a tf.data pipeline that materialises lookback windows one batch at a time.
 
-        X_train, y_train = create_sequences(train_scaled_features, train_scaled_target, self.lookback_periods)
-        X_val, y_val = create_sequences(val_scaled_features, val_scaled_target, self.lookback_periods)
+        Only the underlying (bars, features) matrix is held as a tensor; each
+        batch gathers its windows from it on the fly.
 
-        print(f"   Prepared sequential data: X_train shape {X_train.shape}")
-        return X_train, y_train, X_val, y_val
+        Args:
+            X_windows: Consecutive windows as returned by _create_windows()
+            y: Targets aligned with X_windows
+            batch_size: Samples per batch
+            shuffle: Reshuffle samples every epoch (training set)
+            sample_idx: Optional subset of window indices to use
+
+        Returns:
+            Batched, prefetched dataset of (windows, targets)
+        """
+        # Consecutive windows overlap, so the first window plus the last row of
+        # every other window reconstructs the feature matrix
+        rows = np.concatenate([X_windows[0], X_windows[1:, -1]])
+        features_t = tf.constant(rows, dtype=tf.float32)
+        targets_t = tf.constant(y, dtype=tf.float32)
+        offsets = tf.range(self.lookback_periods, dtype=tf.int64)
+
+        if sample_idx is None:
+            sample_idx = np.arange(len(X_windows))
+        ds = tf.data.Dataset.from_tensor_slices(sample_idx.astype(np.int64))
+        if shuffle:
+            ds = ds.shuffle(len(sample_idx), seed=42, reshuffle_each_iteration=True)
+        ds = ds.batch(batch_size).map(
+            lambda idx: (tf.gather(features_t, idx[:, None] + offsets), tf.gather(targets_t, idx)),
+            num_parallel_calls=tf.data.AUTOTUNE
+        )
+        return ds.prefetch(tf.data.AUTOTUNE)
+
+    def _fit_dl_model(self, model: Model, X_train: np.ndarray, y_train: np.ndarray,
+                      X_val: np.ndarray, y_val: np.ndarray, callbacks: List[Any],
+                      train_idx: Optional[np.ndarray] = None,
+                      epochs: int = 150, batch_size: int = 64) -> Any:
+        """
+        Fit a deep learning model, optionally streaming windows through tf.data.
+
+        With lazy_windows enabled the windows are gathered per batch instead of
+        being copied into one (samples, lookback, features) tensor up front.
+        ``train_idx`` selects the training samples to use (all when None).
+        """
+        if self.lazy_windows and len(X_train) > 0 and len(X_val) > 0:
+            return model.fit(
+                self._make_window_dataset(X_train, y_train, batch_size, shuffle=True, sample_idx=train_idx),
+                validation_data=self._make_window_dataset(X_val, y_val, batch_size, shuffle=False),
+                epochs=epochs,
+                callbacks=callbacks,
+                verbose=1
+            )
+        if train_idx is not None:
+            X_train, y_train = X_train[train_idx], y_train[train_idx]
+        return model.fit(
+            X_train, y_train,
+            validation_data=(X_val, y_val),
+            epochs=epochs,
+            batch_size=batch_size,
+            callbacks=callbacks,
+            verbose=1
+        )
 
     def _prepare_tabular_data(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series, pd.DataFrame, pd.Series, List[str]]:
         """
@@ -649,25 +2186,7 @@ class UnifiedLSTMPredictor:
         Returns:
             Tuple of (X_train, y_train, X_val, y_val, feature_columns)
         """
-        print("Preparing tabular data for tree-based models...")
-        df_tabular = df.copy()
-        feature_cols_tabular = self.feature_cols[:]
-
-        # Create lag features
-        for col in self.feature_cols:
-            for lag in [1, 3, 5, 10]:
-                new_col = f'{col}_lag_{lag}'
-                df_tabular[new_col] = df_tabular[col].shift(lag)
-                if new_col not in feature_cols_tabular:
-                    feature_cols_tabular.append(new_col)
-
-        df_tabular.dropna(inplace=True)
-        final_feature_cols = [c for c in feature_cols_tabular if c in df_tabular.columns]
-
-        # Split data
-        train_size = int(len(df_tabular) * 0.85)
-        train_df = df_tabular[:train_size]
-        val_df = df_tabular[train_size:]
+        train_df, val_df, final_feature_cols = self._prepare_tabular_frame(df)
 
         X_train = train_df[final_feature_cols]
         y_train = train_df[self.target_column]
@@ -677,22 +2196,87 @@ class UnifiedLSTMPredictor:
         print(f"   Prepared tabular data: X_train shape {X_train.shape}")
         return X_train, y_train, X_val, y_val, final_feature_cols
 
-    def _build_dl_model(self, model_type: str, input_shape: Tuple[int, int], hp: Optional[kt.HyperParameters] = None) -> Model:
+    def _prepare_tabular_frame(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame, List[str]]:
         """
-        Build a deep learning model.
+        Build and split the lagged tabular frame, independent of the target.
 
-        Args:
-            model_type: Type of model ('lstm', 'gru', 'transformer', 'tcn')
-            input_shape: Input shape (lookback, features)
-            hp: Hyperparameters for tuning
+        Rows are dropped on NaN in any column (all targets included), so the
+        same split serves every prediction horizon.
 
         Returns:
-            Compiled Keras model
+            Tuple of (train_df, val_df, feature_columns)
         """
-        # Default hyperparameters
-        lstm_units = 64
-        conv_filters = 64
-        dropout_rate = 0.3
+        print("Preparing tabular data for tree-based models...")
+        df_tabular, feature_cols_tabular = self._build_tabular_lag_frame(df)
+
+        df_tabular.dropna(inplace=True)
+        final_feature_cols = [c for c in feature_cols_tabular if c in df_tabular.columns]
+
+        # Split data
+        train_size = int(len(df_tabular) * 0.85)
+        return df_tabular[:train_size], df_tabular[train_size:], final_feature_cols
+
+    def _build_tabular_lag_frame(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+        """
+        Add the LightGBM lag features (lags 1/3/5/10 of every selected feature) to a frame.
+
+        All lag columns are shifted over the whole frame in one pass.  Shifts are
+        causal, so row ``i`` holds exactly what a frame truncated at ``i`` would,
+        and backtests can index this frame per bar instead of rebuilding it.
+
+        Args:
+            df: DataFrame containing self.feature_cols
+
+        Returns:
+            Tuple of (frame with lag columns, tabular feature column names)
+        """
+        feature_cols_tabular = self.feature_cols[:]
+        lagged = {}
+        for col in self.feature_cols:
+            for lag in [1, 3, 5, 10]:
+                new_col = f'{col}_lag_{lag}'
+                lagged[new_col] = df[col].shift(lag)
+                if new_col not in feature_cols_tabular:
+                    feature_cols_tabular.append(new_col)
+
+        lag_frame = pd.DataFrame(lagged, index=df.index)
+        df_tabular = pd.concat([df.drop(columns=df.columns.intersection(lag_frame.columns)), lag_frame], axis=1)
+        return df_tabular, feature_cols_tabular
+
+    def _predict_lgbm_batched(self, model: Any, df_tabular: pd.DataFrame, bar_idx: np.ndarray) -> np.ndarray:
+        """
+        Predict log returns for many bars with a single LightGBM call.
+
+        Args:
+            model: Fitted LGBMRegressor
+            df_tabular: Forward-filled frame from _build_tabular_lag_frame()
+            bar_idx: Positional indices of the bars to predict
+
+        Returns:
+            Predicted log returns, one per entry in bar_idx
+        """
+        X_tab = df_tabular[model.feature_name_].values[bar_idx]
+        return np.asarray(model.predict(X_tab), dtype=np.float64)
+
+    def _build_dl_model(self, model_type: str, input_shape: Tuple[int, int], hp: Optional[kt.HyperParameters] = None,
+                        multi_head: bool = False) -> Model:
+        """
+        Build a deep learning model.
+
+        Args:
+            model_type: Type of model ('lstm', 'gru', 'transformer', 'tcn')
+            input_shape: Input shape (lookback, features)
+            hp: Hyperparameters for tuning
+            multi_head: Put one output head per horizon (1H/4H/1D) on the shared
+                encoder; the output has one column per head
+
+        Returns:
+            Compiled Keras model
+        """
+        # Default hyperparameters
+        lstm_units = 64
+        conv_filters = 64
+        dropout_rate = 0.3
         learning_rate = 0.0005
 
         # Override with tuning hyperparameters if provided
@@ -711,7 +2295,7 @@ class UnifiedLSTMPredictor:
             x = layers.Bidirectional(layers.LSTM(lstm_units, return_sequences=True))(x)
             x = layers.Dropout(dropout_rate)(x)
             x = layers.LayerNormalization()(x)
-            x = AttentionLayer()(x)  # Attention instead of GlobalAveragePooling
+            x = custom_layers()['AttentionLayer']()(x)  # Attention instead of GlobalAveragePooling
             
         elif model_type == 'gru':
             # NEW: GRU model - lighter than LSTM, often comparable performance
@@ -722,7 +2306,8 @@ class UnifiedLSTMPredictor:
             x = layers.Dropout(dropout_rate)(x)
             
         elif model_type == 'transformer':
-            x = TransformerBlock(embed_dim=input_shape[1], num_heads=4, ff_dim=64, rate=dropout_rate)(x)
+            x = custom_layers()['TransformerBlock'](embed_dim=input_shape[1], num_heads=4, ff_dim=64,
+                                                    rate=dropout_rate)(x)
             x = layers.GlobalAveragePooling1D()(x)
             
         elif model_type == 'tcn':
@@ -783,7 +2368,11 @@ class UnifiedLSTMPredictor:
         x = layers.Dense(128, activation='relu')(x)
         x = layers.Dropout(dropout_rate)(x)
         x = layers.Dense(64, activation='relu')(x)  # Added extra layer for consistency
-        outputs = layers.Dense(1, activation='linear')(x)
+        if multi_head:
+            heads = [layers.Dense(1, activation='linear', name=f'head_{tf_name}')(x) for tf_name in MULTI_HEAD_TIMEFRAMES]
+            outputs = layers.Concatenate(name='horizons')(heads)
+        else:
+            outputs = layers.Dense(1, activation='linear')(x)
 
         model = Model(inputs=inputs, outputs=outputs)
         model.compile(optimizer=Adam(learning_rate=learning_rate), loss='huber', metrics=['mae'])
@@ -925,7 +2514,9 @@ class UnifiedLSTMPredictor:
         df_selected = self.perform_feature_selection(df_features)
 
         # Prepare data for different model types
-        X_train_seq, y_train_seq, X_val_seq, y_val_seq = self._prepare_sequential_data(df_selected)
+        seq_data = self._prepare_sequential_features(df_selected)
+        X_train_seq, y_train_seq, train_idx_seq, X_val_seq, y_val_seq = \
+            self._prepare_sequential_targets(seq_data, self.target_column)
         X_train_tab, y_train_tab, X_val_tab, y_val_tab, _ = self._prepare_tabular_data(df_selected)
 
         # Save scalers
@@ -949,49 +2540,23 @@ class UnifiedLSTMPredictor:
             print("No tuning data found. Using default hyperparameters for DL models.")
 
         # Train each model in the ensemble
+        data = {
+            'train_features': seq_data['train_features'], 'val_features': seq_data['val_features'],
+            'targets': {self.target_column: (y_train_seq, train_idx_seq, y_val_seq)},
+            'X_train_tab': X_train_tab, 'X_val_tab': X_val_tab,
+            'tab_targets': {self.target_column: (y_train_tab, y_val_tab)}
+        }
+        jobs = []
         model_type_counts = defaultdict(int)
         for model_type in self.ensemble_model_types:
             model_index = model_type_counts[model_type]
-            print(f"\n--- Training Model {model_type.upper()} (Instance {model_index}) ---")
-            tf.random.set_seed(42 + model_index)
-
-            if model_type in ['lstm', 'gru', 'transformer', 'tcn']:
-                # Train deep learning model
-                model = self._build_dl_model(model_type, (X_train_seq.shape[1], X_train_seq.shape[2]), hp=best_hps)
-                callbacks = [
-                    EarlyStopping('val_loss', patience=15, restore_best_weights=True),
-                    ReduceLROnPlateau('val_loss', patience=5, factor=0.5)
-                ]
-                model.fit(
-                    X_train_seq, y_train_seq,
-                    validation_data=(X_val_seq, y_val_seq),
-                    epochs=150,
-                    batch_size=64,
-                    callbacks=callbacks,
-                    verbose=1
-                )
-                model.save(self._get_model_path(model_type, model_index))
-
-            elif model_type == 'lgbm':
-                # Train LightGBM model
-                model = lgb.LGBMRegressor(
-                    objective='regression_l1',
-                    n_estimators=1000,
-                    learning_rate=0.05,
-                    random_state=42 + model_index,
-                    n_jobs=-1,
-                    verbose=-1
-                )
-                model.fit(
-                    X_train_tab, y_train_tab,
-                    eval_set=[(X_val_tab, y_val_tab)],
-                    eval_metric='mae',
-                    callbacks=[lgb.early_stopping(100, verbose=False)]
-                )
-                with open(self._get_model_path(model_type, model_index), 'wb') as f:
-                    pickle.dump(model, f)
-
+            jobs.append({
+                'model_type': model_type, 'model_index': model_index, 'target': self.target_column,
+                'model_path': self._get_model_path(model_type, model_index),
+                'label': f"Model {model_type.upper()} (Instance {model_index})"
+            })
             model_type_counts[model_type] += 1
+        self._run_training_jobs(jobs, data, best_hps)
 
         print("\nEnsemble training complete and all assets saved.")
         self.load_model_assets()
@@ -1048,19 +2613,33 @@ class UnifiedLSTMPredictor:
         except Exception:
             print("No tuning data found. Using default hyperparameters.")
 
-        # Train a separate ensemble for each timeframe
+        # Feature scaling, lookback windows and lag features don't depend on the
+        # target, so build them once and share them across all horizons
+        seq_data = self._prepare_sequential_features(df_selected)
+        tab_train_df, tab_val_df, tab_feature_cols = self._prepare_tabular_frame(df_selected)
+        X_train_tab = tab_train_df[tab_feature_cols]
+        X_val_tab = tab_val_df[tab_feature_cols]
+        print(f"   Prepared tabular data: X_train shape {X_train_tab.shape}")
+
+        # Every (timeframe, member) pair becomes one independent training job
+        data = {
+            'train_features': seq_data['train_features'], 'val_features': seq_data['val_features'],
+            'targets': {}, 'X_train_tab': X_train_tab, 'X_val_tab': X_val_tab, 'tab_targets': {}
+        }
+        jobs = []
         for tf_name, target_col in timeframe_targets.items():
             print(f"\n{'=' * 60}")
-            print(f"Training Ensemble for {tf_name} Predictions (Target: {target_col})")
+            print(f"Preparing Ensemble for {tf_name} Predictions (Target: {target_col})")
             print(f"{'=' * 60}\n")
 
             # Temporarily change the target column
             original_target = self.target_column
             self.target_column = target_col
 
-            # Prepare data with this target
-            X_train_seq, y_train_seq, X_val_seq, y_val_seq = self._prepare_sequential_data(df_selected)
-            X_train_tab, y_train_tab, X_val_tab, y_val_tab, _ = self._prepare_tabular_data(df_selected)
+            # Only outlier filtering and target scaling are per-timeframe
+            _, y_train_seq, train_idx_seq, _, y_val_seq = self._prepare_sequential_targets(seq_data, target_col)
+            data['targets'][tf_name] = (y_train_seq, train_idx_seq, y_val_seq)
+            data['tab_targets'][tf_name] = (tab_train_df[target_col], tab_val_df[target_col])
 
             # Save scalers for this timeframe
             scaler_suffix = f"_{tf_name}"
@@ -1069,57 +2648,41 @@ class UnifiedLSTMPredictor:
             with open(self.target_scaler_path.replace('.pkl', f'{scaler_suffix}.pkl'), 'wb') as f:
                 pickle.dump(self.target_scaler, f)
 
-            # Train each model type for this timeframe
+            # Queue each model type for this timeframe
             model_type_counts = defaultdict(int)
             for model_type in self.ensemble_model_types:
                 model_index = model_type_counts[model_type]
-                print(f"\n--- Training {model_type.upper()} for {tf_name} (Instance {model_index}) ---")
-                tf.random.set_seed(42 + model_index)
+                model_type_counts[model_type] += 1
+                if model_type in ['lstm', 'gru', 'transformer', 'tcn'] and self.multi_head:
+                    # Trained once for all timeframes below
+                    continue
 
-                if model_type in ['lstm', 'gru', 'transformer', 'tcn']:
-                    model = self._build_dl_model(model_type, (X_train_seq.shape[1], X_train_seq.shape[2]), hp=best_hps)
-                    callbacks = [
-                        EarlyStopping('val_loss', patience=15, restore_best_weights=True),
-                        ReduceLROnPlateau('val_loss', patience=5, factor=0.5)
-                    ]
-                    model.fit(
-                        X_train_seq, y_train_seq,
-                        validation_data=(X_val_seq, y_val_seq),
-                        epochs=150,
-                        batch_size=64,
-                        callbacks=callbacks,
-                        verbose=1
-                    )
-                    # Save with timeframe suffix
-                    model_path = self._get_model_path(model_type, model_index).replace('.keras', f'_{tf_name}.keras')
-                    model.save(model_path)
-                    print(f"Saved: {model_path}")
+                # Save with timeframe suffix
+                ext = '.keras' if model_type in ['lstm', 'gru', 'transformer', 'tcn'] else '.pkl'
+                jobs.append({
+                    'model_type': model_type, 'model_index': model_index, 'target': tf_name,
+                    'model_path': self._get_model_path(model_type, model_index).replace(ext, f'_{tf_name}{ext}'),
+                    'label': f"{model_type.upper()} for {tf_name} (Instance {model_index})"
+                })
 
-                elif model_type == 'lgbm':
-                    model = lgb.LGBMRegressor(
-                        objective='regression_l1',
-                        n_estimators=1000,
-                        learning_rate=0.05,
-                        random_state=42 + model_index,
-                        n_jobs=-1,
-                        verbose=-1
-                    )
-                    model.fit(
-                        X_train_tab, y_train_tab,
-                        eval_set=[(X_val_tab, y_val_tab)],
-                        eval_metric='mae',
-                        callbacks=[lgb.early_stopping(100, verbose=False)]
-                    )
-                    # Save with timeframe suffix
-                    model_path = self._get_model_path(model_type, model_index).replace('.pkl', f'_{tf_name}.pkl')
-                    with open(model_path, 'wb') as f:
-                        pickle.dump(model, f)
-                    print(f"Saved: {model_path}")
+            # Restore original target
+            self.target_column = original_target
 
+        if self.multi_head:
+            data['targets'][MULTI_HEAD_TARGET] = self._stack_multi_head_targets(data['targets'])
+            model_type_counts = defaultdict(int)
+            for model_type in self.ensemble_model_types:
+                model_index = model_type_counts[model_type]
                 model_type_counts[model_type] += 1
+                if model_type in ['lstm', 'gru', 'transformer', 'tcn']:
+                    jobs.append({
+                        'model_type': model_type, 'model_index': model_index, 'target': MULTI_HEAD_TARGET,
+                        'model_path': self._get_multi_head_model_path(model_type, model_index),
+                        'label': f"multi-head {model_type.upper()} for "
+                                 f"{'/'.join(MULTI_HEAD_TIMEFRAMES)} (Instance {model_index})"
+                    })
 
-            # Restore original target
-            self.target_column = original_target
+        self._run_training_jobs(jobs, data, best_hps)
 
         # Copy 1H scalers and models to base names for backward compatibility
         print("\nSaving base scalers and models for backward compatibility...")
@@ -1138,8 +2701,9 @@ class UnifiedLSTMPredictor:
                 shutil.copy(h1_target_scaler, self.target_scaler_path)
                 print(f"[OK] Copied {os.path.basename(h1_target_scaler)} -> {os.path.basename(self.target_scaler_path)}")
 
-            # Copy model files
+            # Copy model files, only those written by this run
             print("\nCopying 1H models to base names...")
+            written_paths = {job['model_path'] for job in jobs}
             model_type_counts = defaultdict(int)
             for model_type in self.ensemble_model_types:
                 model_index = model_type_counts[model_type]
@@ -1149,9 +2713,12 @@ class UnifiedLSTMPredictor:
                 ext = '.keras' if model_type in ['lstm', 'gru', 'transformer', 'tcn'] else '.pkl'
                 h1_model_path = base_model_path.replace(ext, f'_1H{ext}')
 
-                if os.path.exists(h1_model_path):
+                if h1_model_path in written_paths and os.path.exists(h1_model_path):
                     shutil.copy(h1_model_path, base_model_path)
                     print(f"[OK] Copied {os.path.basename(h1_model_path)} -> {os.path.basename(base_model_path)}")
+                elif self.multi_head and ext == '.keras':
+                    print(f"WARNING: {model_type}_{model_index} was trained multi-head; "
+                          f"{os.path.basename(base_model_path)} was not updated for the single-timeframe modes")
 
                 model_type_counts[model_type] += 1
 
@@ -1168,6 +2735,247 @@ class UnifiedLSTMPredictor:
         actual_end = self.train_end or (df_h1.index.max().to_pydatetime() if df_h1 is not None else None)
         self._save_cutoff_manifest(self.train_start, actual_end)
 
+    def _stack_multi_head_targets(self, targets: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]]
+                                  ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Stack per-timeframe targets into the (samples, horizons) layout of a multi-head model.
+
+        Args:
+            targets: Per-timeframe (y_train, train_idx, y_val) from _prepare_sequential_targets()
+
+        Returns:
+            Tuple of (y_train, train_idx, y_val) covering MULTI_HEAD_TIMEFRAMES
+        """
+        y_train = np.hstack([targets[tf_name][0] for tf_name in MULTI_HEAD_TIMEFRAMES])
+        y_val = np.hstack([targets[tf_name][2] for tf_name in MULTI_HEAD_TIMEFRAMES])
+
+        # A sample is used only if it isn't an outlier for any horizon
+        train_idx = targets[MULTI_HEAD_TIMEFRAMES[0]][1]
+        for tf_name in MULTI_HEAD_TIMEFRAMES[1:]:
+            train_idx = np.intersect1d(train_idx, targets[tf_name][1])
+        return y_train, train_idx, y_val
+
+    def _train_member(self, job: Dict[str, Any], data: Dict[str, Any],
+                      best_hps: Optional[kt.HyperParameters], n_jobs: int = -1) -> float:
+        """
+        Train and save a single ensemble member.
+
+        Args:
+            job: Member description ('model_type', 'model_index', 'target', 'model_path', 'label')
+            data: Shared training data built by the train modes
+            best_hps: Tuned hyperparameters, if any
+            n_jobs: LightGBM threads
+
+        Returns:
+            Wall time in seconds
+        """
+        start = time.time()
+        model_type, model_index = job['model_type'], job['model_index']
+        print(f"\n--- Training {job['label']} ---")
+        tf.random.set_seed(42 + model_index)
+
+        if model_type in ['lstm', 'gru', 'transformer', 'tcn']:
+            y_train, train_idx, y_val = data['targets'][job['target']]
+            X_train = self._create_windows(data['train_features'])
+            X_val = self._create_windows(data['val_features'])
+            model = self._build_dl_model(model_type, (X_train.shape[1], X_train.shape[2]), hp=best_hps,
+                                         multi_head=(job['target'] == MULTI_HEAD_TARGET))
+            callbacks = [
+                EarlyStopping('val_loss', patience=15, restore_best_weights=True),
+                ReduceLROnPlateau('val_loss', patience=5, factor=0.5)
+            ]
+            self._fit_dl_model(model, X_train, y_train, X_val, y_val, callbacks, train_idx=train_idx)
+            model.save(job['model_path'])
+
+        elif model_type == 'lgbm':
+            y_train_tab, y_val_tab = data['tab_targets'][job['target']]
+            model = lgb.LGBMRegressor(
+                objective='regression_l1',
+                n_estimators=1000,
+                learning_rate=0.05,
+                random_state=42 + model_index,
+                n_jobs=n_jobs,
+                verbose=-1
+            )
+            model.fit(
+                data['X_train_tab'], y_train_tab,
+                eval_set=[(data['X_val_tab'], y_val_tab)],
+                eval_metric='mae',
+                callbacks=[lgb.early_stopping(100, verbose=False)]
+            )
+            with open(job['model_path'], 'wb') as f:
+                pickle.dump(model, f)
+
+        print(f"Saved: {job['model_path']}")
+        return time.time() - start
+
+    def _run_training_jobs(self, jobs: List[Dict[str, Any]], data: Dict[str, Any],
+                           best_hps: Optional[kt.HyperParameters]) -> Dict[str, float]:
+        """
+        Train ensemble members, concurrently when train_workers > 1.
+
+        Each worker process gets the shared data once and trains whole members
+        with intra_op_threads TF threads (default: cores / workers).  Every
+        member is seeded with 42 + model_index, so the result doesn't depend on
+        which worker trains it.  If the pool fails, the remaining members are
+        trained in this process.
+
+        Returns:
+            Wall time in seconds per member label
+        """
+        workers = min(self.train_workers, len(jobs))
+        intra_op_threads = self.intra_op_threads or max(1, (os.cpu_count() or 1) // max(workers, 1))
+        inter_op_threads = self.inter_op_threads or (1 if workers > 1 else None)
+        timings: Dict[str, float] = {}
+        start = time.time()
+
+        if workers > 1:
+            predictor_args = {'symbol': self.symbol, 'ensemble_model_types': self.ensemble_model_types,
+                              'lazy_windows': self.lazy_windows}
+            hps_config = best_hps.get_config() if best_hps is not None else None
+            print(f"\nTraining {len(jobs)} ensemble members on {workers} worker processes "
+                  f"({intra_op_threads} intra-op / {inter_op_threads} inter-op TF threads each)...")
+            try:
+                # spawn: forking a process that already initialised TensorFlow is unsafe
+                with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                         initializer=_training_worker_init,
+                                         initargs=(predictor_args, data, hps_config,
+                                                   intra_op_threads, inter_op_threads)) as pool:
+                    # Longest members first so they don't end up as stragglers
+                    ordered = sorted(jobs, key=lambda job: job['model_type'] == 'lgbm')
+                    futures = {pool.submit(_training_worker_run, job): job for job in ordered}
+                    for future in as_completed(futures):
+                        label = futures[future]['label']
+                        try:
+                            timings[label] = future.result()
+                        except Exception as e:
+                            print(f"WARNING: {label} failed in its worker ({e}), retraining it in this process")
+                            continue
+                        print(f"[OK] {label} finished in {timings[label]:.1f}s")
+            except Exception as e:
+                print(f"WARNING: Parallel training failed ({e}), training remaining members in this process")
+        else:
+            if self.intra_op_threads or self.inter_op_threads:
+                try:
+                    if self.intra_op_threads:
+                        tf.config.threading.set_intra_op_parallelism_threads(self.intra_op_threads)
+                    if self.inter_op_threads:
+                        tf.config.threading.set_inter_op_parallelism_threads(self.inter_op_threads)
+                except RuntimeError:
+                    print("WARNING: TensorFlow already initialised, thread settings ignored")
+
+        for job in jobs:
+            if job['label'] not in timings:
+                timings[job['label']] = self._train_member(job, data, best_hps, n_jobs=self.intra_op_threads or -1)
+
+        print("\nPer-member training time:")
+        for job in jobs:
+            print(f"   {job['label']:<45} {timings[job['label']]:8.1f}s")
+        print(f"   {'Total wall time':<45} {time.time() - start:8.1f}s")
+
+        keras_paths = [job['model_path'] for job in jobs if job['model_type'] != 'lgbm']
+        if self.export_tflite and keras_paths:
+            X_val = self._create_windows(data['val_features'])
+            self.export_inference_models(keras_paths, sample=X_val[-64:])
+        return timings
+
+    @staticmethod
+    def _get_tflite_path(keras_path: str) -> str:
+        """Path of the TFLite artifact exported from a .keras model."""
+        return os.path.splitext(keras_path)[0] + '.tflite'
+
+    def export_inference_models(self, keras_paths: Optional[List[str]] = None, sample: Optional[np.ndarray] = None,
+                                tolerance: float = INFERENCE_PARITY_TOLERANCE) -> bool:
+        """
+        Convert saved Keras models to TFLite for live serving and check them against Keras.
+
+        Each model is converted with a batch size of one and built-in TFLite ops
+        only, so the artifact runs on the standalone interpreter.  It is written
+        next to the .keras file only if its outputs on ``sample`` match the Keras
+        model within ``tolerance``; otherwise any older artifact is removed and
+        the loaders keep using Keras for that model.
+
+        Args:
+            keras_paths: Models to convert (default: every .keras model of this symbol)
+            sample: Lookback windows to compare outputs on (default: 64 random windows)
+            tolerance: Largest accepted absolute difference in scaled output
+
+        Returns:
+            True if every model was exported
+        """
+        if keras_paths is None:
+            keras_paths = sorted(glob.glob(os.path.join(self.base_path, f"model_{self.symbol}_*.keras")))
+        if not keras_paths:
+            print("No Keras models to export.")
+            return False
+
+        print(f"\nExporting {len(keras_paths)} models to TFLite (parity tolerance {tolerance:.0e})...")
+        exported = 0
+        for keras_path in keras_paths:
+            tflite_path = self._get_tflite_path(keras_path)
+            name = os.path.basename(tflite_path)
+            try:
+                model = load_model(keras_path, custom_objects=custom_layers())
+                spec = tf.TensorSpec([1, *model.input_shape[1:]], tf.float32)
+                serve = tf.function(lambda x: model(x, training=False), input_signature=[spec])
+                converter = tf.lite.TFLiteConverter.from_concrete_functions([serve.get_concrete_function()], model)
+                converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS]
+                content = converter.convert()
+                lite_model = TFLiteModel(tflite_path, model_content=content)
+
+                X = sample
+                if X is None or len(X) == 0:
+                    X = np.random.default_rng(42).standard_normal((64, *model.input_shape[1:]))
+                X = np.ascontiguousarray(X, dtype=np.float32)
+                keras_out = model(tf.convert_to_tensor(X), training=False).numpy()
+                lite_out = lite_model(X).numpy()
+                max_diff = float(np.max(np.abs(lite_out - keras_out)))
+
+                # Per-call latency for the live batch of one
+                window = tf.convert_to_tensor(X[:1])
+                start = time.perf_counter()
+                for _ in range(20):
+                    model(window, training=False)
+                keras_ms = (time.perf_counter() - start) / 20 * 1000
+                start = time.perf_counter()
+                for _ in range(20):
+                    lite_model(X[:1])
+                lite_ms = (time.perf_counter() - start) / 20 * 1000
+            except Exception as e:
+                print(f"   {name:<45} FAILED: {e}")
+                max_diff = float('inf')
+            else:
+                print(f"   {name:<45} max |diff| {max_diff:.1e}   keras {keras_ms:6.2f} ms   "
+                      f"tflite {lite_ms:6.2f} ms")
+
+            if max_diff <= tolerance:
+                atomic_write(tflite_path, content)
+                exported += 1
+            else:
+                print(f"   WARNING: {name} not exported, {os.path.basename(keras_path)} will be served with Keras")
+                if os.path.exists(tflite_path):
+                    os.remove(tflite_path)
+
+        print(f"Exported {exported}/{len(keras_paths)} TFLite models")
+        return exported == len(keras_paths)
+
+    def _load_dl_model(self, keras_path: str) -> Any:
+        """
+        Load a deep-learning model for inference, preferring its TFLite export.
+
+        The export is used only if it is at least as new as the .keras file, so a
+        retrained model whose export failed falls back to Keras.
+        """
+        tflite_path = self._get_tflite_path(keras_path)
+        if (self.prefer_tflite and os.path.exists(tflite_path)
+                and os.path.getmtime(tflite_path) >= os.path.getmtime(keras_path)):
+            try:
+                return TFLiteModel(tflite_path)
+            except (ValueError, RuntimeError) as e:
+                print(f"WARNING: Could not load {os.path.basename(tflite_path)} ({e}), using Keras")
+        self.tensor_inputs = True
+        return load_model(keras_path, custom_objects=custom_layers())
+
     def load_model_assets(self) -> bool:
         """
         Load all trained models and scalers (single timeframe method).
@@ -1183,10 +2991,10 @@ class UnifiedLSTMPredictor:
             if not self.ensemble_model_types:
                 print("Error: No trained models found. Please run the 'train' command first.")
                 return False
-            self.num_ensemble_models = len(self.ensemble_model_types)
-            self.ensemble_weights = [1.0 / self.num_ensemble_models] * self.num_ensemble_models
+            self._reset_ensemble_scorer()
             print(f"Detected trained models: {self.ensemble_model_types}")
 
+        self.tensor_inputs = any(model_type != 'lgbm' for model_type in self.ensemble_model_types)
         try:
             # Load feature list and scalers
             with open(self.selected_features_path, 'r') as f:
@@ -1273,10 +3081,7 @@ class UnifiedLSTMPredictor:
                 if model_type in ['lstm', 'gru', 'transformer', 'tcn']:
                     self.models[model_name] = load_model(
                         actual_model_path,
-                        custom_objects={
-                            'TransformerBlock': TransformerBlock,
-                            'AttentionLayer': AttentionLayer
-                        }
+                        custom_objects=custom_layers()
                     )
                 elif model_type == 'lgbm':
                     with open(actual_model_path, 'rb') as f:
@@ -1336,6 +3141,7 @@ class UnifiedLSTMPredictor:
                 if not self.ensemble_model_types:
                     print("Error: No trained models found.")
                     return False
+                self._reset_ensemble_scorer()
 
             # Load feature list
             try:
@@ -1348,6 +3154,9 @@ class UnifiedLSTMPredictor:
             timeframe_list = ['1H', '4H', '1D']
             self.models_by_timeframe = {}
             self.scalers_by_timeframe = {}
+            multi_head_models: Dict[str, Any] = {}
+            # Set again by _load_dl_model() for every model that has to be served with Keras
+            self.tensor_inputs = False
 
             for tf_name in timeframe_list:
                 print(f"\nLoading models for {tf_name}...")
@@ -1375,15 +3184,20 @@ class UnifiedLSTMPredictor:
 
                     if model_type in ['lstm', 'gru', 'transformer', 'tcn']:
                         model_path = self._get_model_path(model_type, model_index).replace('.keras', f'_{tf_name}.keras')
-                        if os.path.exists(model_path):
-                            models[model_name] = load_model(
-                                model_path,
-                                custom_objects={
-                                    'TransformerBlock': TransformerBlock,
-                                    'AttentionLayer': AttentionLayer
-                                }
-                            )
-                            print(f"  Loaded {model_name}")
+                        mh_path = self._get_multi_head_model_path(model_type, model_index)
+                        # Prefer a multi-head model unless a per-timeframe one was trained after it
+                        if os.path.exists(mh_path) and (not os.path.exists(model_path) or
+                                                        os.path.getmtime(mh_path) >= os.path.getmtime(model_path)):
+                            if mh_path not in multi_head_models:
+                                multi_head_models[mh_path] = self._load_dl_model(mh_path)
+                            models[model_name] = MultiHeadView(multi_head_models[mh_path],
+                                                               MULTI_HEAD_TIMEFRAMES.index(tf_name))
+                            backend = ', TFLite' if isinstance(multi_head_models[mh_path], TFLiteModel) else ''
+                            print(f"  Loaded {model_name} (multi-head{backend})")
+                        elif os.path.exists(model_path):
+                            models[model_name] = self._load_dl_model(model_path)
+                            backend = ' (TFLite)' if isinstance(models[model_name], TFLiteModel) else ''
+                            print(f"  Loaded {model_name}{backend}")
                         else:
                             print(f"ERROR: Model not found: {model_path}")
                             return False
@@ -1492,17 +3306,18 @@ class UnifiedLSTMPredictor:
         ext = 'keras' if model_type in ['lstm', 'gru', 'transformer', 'tcn'] else 'pkl'
         return os.path.join(self.base_path, f"model_{self.symbol}_{model_type}_{index}.{ext}")
 
+    def _get_multi_head_model_path(self, model_type: str, index: int) -> str:
+        """Get the file path for a multi-head (all timeframes) model."""
+        return self._get_model_path(model_type, index).replace('.keras', '_MH.keras')
+
     def run_prediction_cycle(self):
         """Updated with Macro integration."""
         print(f"\n--- Single-Timeframe Prediction Cycle: {self.symbol} ---")
 
-        # Download main data first
-        df_h1, df_h4, df_d1 = self.download_data(500)
+        # Fetch every timeframe once; the same frames feed the market context and the features
+        df_h1, df_h4, df_d1, df_dxy, df_spx = self.download_live_data(300)
         if df_h1 is None:
             return
-
-        # Download macro data safely
-        df_dxy, df_spx = self._download_macro_data(300)
         context = self.get_market_context(df_h1, df_dxy, df_spx)
 
         print("\n" + "=" * 60)
@@ -1515,28 +3330,14 @@ class UnifiedLSTMPredictor:
         if not self.models:
             if not self.load_model_assets():
                 return
+            self._restore_ensemble_state()
 
         # Evaluate past predictions and update weights
         self._evaluate_past_predictions()
         self.update_ensemble_weights()
 
-        # Download fresh data
-        df_h1 = pd.DataFrame(mt5.copy_rates_from_pos(self.symbol, mt5.TIMEFRAME_H1, 0, 300))
-        df_h4 = pd.DataFrame(mt5.copy_rates_from_pos(self.symbol, mt5.TIMEFRAME_H4, 0, 300))
-        df_d1 = pd.DataFrame(mt5.copy_rates_from_pos(self.symbol, mt5.TIMEFRAME_D1, 0, 300))
-
-        # Validate data
-        for df, name in [(df_h1, "H1"), (df_h4, "H4"), (df_d1, "D1")]:
-            if df.empty or len(df) < 100:
-                print(f"ERROR: Insufficient {name} data for prediction")
-                return
-            df['time'] = pd.to_datetime(df['time'], unit='s')
-            df.set_index('time', inplace=True)
-            if 'tick_volume' in df.columns:
-                df.rename(columns={'tick_volume': 'volume'}, inplace=True)
-
-        # Create features
-        df = self.create_features(df_h1, df_h4, df_d1)
+        # Update features incrementally with the bars closed since the last cycle
+        df = self._live_features(df_h1, df_h4, df_d1)
         current_price = df['close'].iloc[-1]
 
         # Prepare sequential input
@@ -1545,7 +3346,7 @@ class UnifiedLSTMPredictor:
         X_pred_seq = last_sequence_scaled.reshape(1, self.lookback_periods, len(self.feature_cols))
 
         # Convert to TensorFlow tensor to avoid retracing warnings
-        X_pred_seq = tf.convert_to_tensor(X_pred_seq, dtype=tf.float32)
+        X_pred_seq = self._sequence_input(X_pred_seq)
 
         # Prepare tabular input for LightGBM
         df_tabular = df.copy()
@@ -1603,6 +3404,8 @@ class UnifiedLSTMPredictor:
                         
                 except Exception as e:
                     print(f"WARNING: Error predicting with {model_name}: {e}")
+                    # Keep the slot so weights stay aligned with the models
+                    ensemble_preds.append(np.nan)
                     continue
 
                 raw_log_returns.append(pred_log_return)
@@ -1619,7 +3422,7 @@ class UnifiedLSTMPredictor:
                 ensemble_preds.append(predicted_price)
 
             # Check if we have valid predictions
-            if not ensemble_preds:
+            if not np.isfinite(ensemble_preds).any():
                 print(f"ERROR: No valid predictions for {tf_name}, skipping")
                 continue
 
@@ -1629,9 +3432,11 @@ class UnifiedLSTMPredictor:
             print(f"  Predicted prices: {[f'{p:.5f}' for p in ensemble_preds]}")
 
             ensemble_predictions_map[tf_name] = ensemble_preds
-            raw_prediction = np.average(ensemble_preds, weights=self.ensemble_weights[:len(ensemble_preds)])
+            weights = self.ensemble_scorer.weights_for(tf_name)[:len(ensemble_preds)]
+            raw_prediction = self._combine_ensemble_prices([np.array([p]) for p in ensemble_preds],
+                                                           np.array([current_price]), weights)[0]
 
-            print(f"  Raw ensemble average: {raw_prediction:.5f}")
+            print(f"  Raw ensemble average: {raw_prediction:.5f} (weights: {[f'{w:.3f}' for w in weights]})")
 
             # Apply smoothing to log returns
             raw_log_return = np.log(raw_prediction / current_price)
@@ -1673,7 +3478,7 @@ class UnifiedLSTMPredictor:
             predictions[tf_name] = {
                 'prediction': round(smoothed_prediction, 5),
                 'change_pct': round(change_pct, 3),
-                'ensemble_std': round(np.std(ensemble_preds), 5),
+                'ensemble_std': round(np.nanstd(ensemble_preds), 5),
             }
 
         # Log predictions for future evaluation
@@ -1685,7 +3490,8 @@ class UnifiedLSTMPredictor:
             'status': 'online',
             'symbol': self.symbol,
             'current_price': round(current_price, 5),
-            'ensemble_weights': [round(w, 3) for w in self.ensemble_weights],
+            'ensemble_weights': {tf_name: [round(w, 3) for w in self.ensemble_scorer.weights_for(tf_name)]
+                                 for tf_name in timeframes},
             'price': df_h1['close'].iloc[-1],
             'market_context': context,
             'trade_allowed': not context['veto_active']
@@ -1693,6 +3499,9 @@ class UnifiedLSTMPredictor:
 
         self.save_to_file(self.predictions_file, predictions)
         self.save_to_file(self.status_file, status)
+        if self.binary_output:
+            self.publish_binary_predictions(predictions, current_price, status['trade_allowed'])
+        self._save_ensemble_state()
 
         # Display results
         print("\n--- Prediction Cycle Complete! ---")
@@ -1706,13 +3515,10 @@ class UnifiedLSTMPredictor:
         """Updated with Macro integration."""
         print(f"\n--- Multi-Timeframe Cycle: {self.symbol} ---")
 
-        # Download main data first
-        df_h1, df_h4, df_d1 = self.download_data(500)
+        # Fetch every timeframe once; the same frames feed the market context and the features
+        df_h1, df_h4, df_d1, df_dxy, df_spx = self.download_live_data(300)
         if df_h1 is None:
             return
-
-        # Download macro data safely
-        df_dxy, df_spx = self._download_macro_data(300)
         context = self.get_market_context(df_h1, df_dxy, df_spx)
 
         print("\n" + "=" * 60)
@@ -1722,27 +3528,22 @@ class UnifiedLSTMPredictor:
         if not hasattr(self, 'models_by_timeframe') or not self.models_by_timeframe:
             if not self.load_model_assets_multitimeframe():
                 return
+            self._restore_ensemble_state()
 
-        # Download fresh data
-        df_h1 = pd.DataFrame(mt5.copy_rates_from_pos(self.symbol, mt5.TIMEFRAME_H1, 0, 300))
-        df_h4 = pd.DataFrame(mt5.copy_rates_from_pos(self.symbol, mt5.TIMEFRAME_H4, 0, 300))
-        df_d1 = pd.DataFrame(mt5.copy_rates_from_pos(self.symbol, mt5.TIMEFRAME_D1, 0, 300))
-
-        # Validate data
-        for df, name in [(df_h1, "H1"), (df_h4, "H4"), (df_d1, "D1")]:
-            if df.empty or len(df) < 100:
-                print(f"ERROR: Insufficient {name} data")
-                return
-            df['time'] = pd.to_datetime(df['time'], unit='s')
-            df.set_index('time', inplace=True)
-            if 'tick_volume' in df.columns:
-                df.rename(columns={'tick_volume': 'volume'}, inplace=True)
+        # Evaluate past predictions and update the per-timeframe weights
+        self._evaluate_past_predictions()
+        self.update_ensemble_weights()
 
-        # Create features
-        df = self.create_features(df_h1, df_h4, df_d1)
+        # Update features incrementally with the bars closed since the last cycle
+        df = self._live_features(df_h1, df_h4, df_d1)
         current_price = df['close'].iloc[-1]
 
         predictions = {}
+        ensemble_predictions_map = {}
+        df_tabular = None
+        # Multi-head models predict every horizon in one forward pass; cache it per cycle.
+        # They are trained on one shared feature scaler, so any timeframe's input works.
+        multi_head_outputs: Dict[int, np.ndarray] = {}
 
         print("\nMaking predictions with timeframe-specific models...")
         for tf_name, models in self.models_by_timeframe.items():
@@ -1759,23 +3560,22 @@ class UnifiedLSTMPredictor:
             X_pred_seq = last_sequence_scaled.reshape(1, self.lookback_periods, len(self.feature_cols))
 
             # Convert to TensorFlow tensor to avoid retracing warnings
-            X_pred_seq = tf.convert_to_tensor(X_pred_seq, dtype=tf.float32)
+            X_pred_seq = self._sequence_input(X_pred_seq)
 
             # Get predictions from each model
             ensemble_preds = []
             for model_name, model in models.items():
                 try:
                     if 'lgbm' in model_name:
-                        # Prepare tabular data for LightGBM
-                        df_tabular = df.copy()
-                        for col in self.feature_cols:
-                            for lag in [1, 3, 5, 10]:
-                                new_col = f'{col}_lag_{lag}'
-                                df_tabular[new_col] = df_tabular[col].shift(lag)
-                        df_tabular.ffill(inplace=True)
-
-                        X_pred_tab = df_tabular.iloc[-1][model.feature_name_].values.reshape(1, -1)
-                        pred_log_return = model.predict(X_pred_tab)[0]
+                        # Prepare tabular data for LightGBM (built once per cycle)
+                        if df_tabular is None:
+                            df_tabular = self._build_tabular_lag_frame(df)[0].ffill()
+                        pred_log_return = self._predict_lgbm_batched(model, df_tabular, np.array([len(df_tabular) - 1]))[0]
+                    elif isinstance(model, MultiHeadView):
+                        if id(model.model) not in multi_head_outputs:
+                            multi_head_outputs[id(model.model)] = model.model(X_pred_seq, training=False).numpy()[0]
+                        pred_log_return_scaled = multi_head_outputs[id(model.model)][model.head_index]
+                        pred_log_return = target_scaler.inverse_transform([[pred_log_return_scaled]])[0][0]
                     else:
                         # Deep learning model - use direct call to avoid retracing
                         pred_log_return_scaled = model(X_pred_seq, training=False).numpy()[0][0]
@@ -1793,23 +3593,27 @@ class UnifiedLSTMPredictor:
                     # Convert log return to price (NO SCALING!)
                     predicted_price = current_price * np.exp(pred_log_return)
 
-                    if not np.isnan(predicted_price) and not np.isinf(predicted_price):
-                        ensemble_preds.append(predicted_price)
+                    # Invalid prices stay as NaN so weights stay aligned with the models
+                    ensemble_preds.append(predicted_price if np.isfinite(predicted_price) else np.nan)
 
                 except Exception as e:
                     print(f"WARNING: Error with {model_name} for {tf_name}: {e}")
+                    ensemble_preds.append(np.nan)
                     continue
 
-            if not ensemble_preds:
+            if not np.isfinite(ensemble_preds).any():
                 print(f"ERROR: No valid predictions for {tf_name}")
                 continue
 
-            # Average ensemble predictions
-            raw_prediction = np.mean(ensemble_preds)
+            # Weighted ensemble with this timeframe's learned weights
+            ensemble_predictions_map[tf_name] = ensemble_preds
+            weights = self.ensemble_scorer.weights_for(tf_name)[:len(ensemble_preds)]
+            raw_prediction = self._combine_ensemble_prices([np.array([p]) for p in ensemble_preds],
+                                                           np.array([current_price]), weights)[0]
 
             print(f"\n{tf_name}:")
             print(f"  Ensemble predictions: {[f'{p:.5f}' for p in ensemble_preds]}")
-            print(f"  Average: {raw_prediction:.5f}")
+            print(f"  Weighted average: {raw_prediction:.5f} (weights: {[f'{w:.3f}' for w in weights]})")
 
             # Apply smoothing
             raw_log_return = np.log(raw_prediction / current_price)
@@ -1846,9 +3650,12 @@ class UnifiedLSTMPredictor:
             predictions[tf_name] = {
                 'prediction': round(smoothed_prediction, 5),
                 'change_pct': round(change_pct, 3),
-                'ensemble_std': round(np.std(ensemble_preds), 5)
+                'ensemble_std': round(np.nanstd(ensemble_preds), 5)
             }
 
+        # Log predictions for future evaluation
+        self._log_prediction_for_evaluation({"1H": 1, "4H": 4, "1D": 24}, ensemble_predictions_map, current_price)
+
         # Save predictions
         status = {
             'last_update': datetime.now().isoformat(),
@@ -1856,12 +3663,17 @@ class UnifiedLSTMPredictor:
             'symbol': self.symbol,
             'current_price': round(current_price, 5),
             'method': 'multi-timeframe',
+            'ensemble_weights': {tf_name: [round(w, 3) for w in self.ensemble_scorer.weights_for(tf_name)]
+                                 for tf_name in self.models_by_timeframe},
             'market_context': context,
             'trade_allowed': not context['veto_active']
         }
 
         self.save_to_file(self.predictions_file, predictions)
         self.save_to_file(self.status_file, status)
+        if self.binary_output:
+            self.publish_binary_predictions(predictions, current_price, status['trade_allowed'])
+        self._save_ensemble_state()
 
         # Display results
         print("\n--- Prediction Cycle Complete! ---")
@@ -1875,139 +3687,171 @@ class UnifiedLSTMPredictor:
                                        ensemble_predictions_map: Dict[str, List[float]],
                                        current_price: float) -> None:
         """Log predictions for future evaluation."""
-        try:
-            with open(self.pending_eval_path, 'r') as f:
-                pending = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            pending = []
-
+        # Evaluation times are on the broker clock so they compare directly with bar times
+        broker_now = self._broker_now()
+        if broker_now is None:
+            print("Error logging predictions for evaluation: no H1 bar available")
+            return
         now = datetime.now()
+        entries = []
         for tf_name, steps in timeframes_steps.items():
             if tf_name in ensemble_predictions_map:
-                pending.append({
-                    "eval_timestamp": (now + timedelta(hours=steps)).isoformat(),
+                entries.append({
+                    "eval_timestamp": (broker_now + timedelta(hours=steps)).isoformat(),
                     "pred_timestamp": now.isoformat(),
                     "timeframe": tf_name,
                     "start_price": current_price,
                     "predictions": ensemble_predictions_map[tf_name]
                 })
 
-        with open(self.pending_eval_path, 'w') as f:
-            json.dump(pending, f, indent=2)
+        try:
+            self.evaluation_store.append(entries)
+        except Exception as e:
+            print(f"Error logging predictions for evaluation: {e}")
 
     def _evaluate_past_predictions(self) -> None:
         """Evaluate past predictions against actual prices."""
         print("Evaluating past predictions for ensemble weighting...")
+        now = self._broker_now()
+        if now is None:
+            print("   No H1 bar available, skipping evaluation.")
+            return
         try:
-            with open(self.pending_eval_path, 'r') as f:
-                pending = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+            pruned = self.evaluation_store.prune(now)
+            due = self.evaluation_store.due(now)
+        except Exception as e:
+            print(f"   Error reading evaluation store: {e}")
+            return
+        if pruned:
+            print(f"   Dropped {pruned} evaluations unresolved past the retention window.")
+        if not due:
             print("   No pending predictions to evaluate.")
             return
 
-        remaining_evals = []
-        evaluated_count = 0
-        now = datetime.now()
+        # One range fetch covers every due entry; each is matched to the last H1 bar
+        # opened at or before its evaluation time, as copy_rates_from(eval_time, 1) would.
+        # The range starts early enough to reach back over a weekend gap.  Evaluation
+        # times are broker wall time, which MT5 bar times hold as if it were UTC, so
+        # they are converted as UTC rather than from the local clock.
+        eval_times = [datetime.fromisoformat(entry['eval_timestamp']).replace(tzinfo=timezone.utc)
+                      for _, entry in due]
+        start = time.perf_counter()
+        try:
+            rates = self.data_source.copy_rates_range(self.symbol, 'H1',
+                                                      min(eval_times) - timedelta(days=4), max(eval_times))
+        except Exception as e:
+            print(f"   Error fetching bars for evaluation: {e}")
+            return
+        fetch_ms = (time.perf_counter() - start) * 1000
+        if rates is None or len(rates) == 0:
+            print(f"   No H1 bars available yet for {len(due)} due predictions, retrying next cycle.")
+            return
 
-        for entry in pending:
-            try:
-                eval_time = datetime.fromisoformat(entry['eval_timestamp'])
-
-                # Ensure timezone-naive datetime for comparison
-                if eval_time.tzinfo is not None:
-                    eval_time = eval_time.replace(tzinfo=None)
-
-                if now >= eval_time:
-                    # Fetch actual price at evaluation time
-                    rates = mt5.copy_rates_from(self.symbol, mt5.TIMEFRAME_H1, eval_time, 1)
-                    if rates is not None and len(rates) > 0:
-                        actual_future_price = rates[0]['close']
-                        self.prediction_history[entry['timeframe']].append({
-                            'predictions': entry['predictions'],
-                            'actual': actual_future_price,
-                            'timestamp': entry['pred_timestamp']
-                        })
-                        # Keep only recent history
-                        if len(self.prediction_history[entry['timeframe']]) > self.ensemble_lookback:
-                            self.prediction_history[entry['timeframe']].pop(0)
-                        evaluated_count += 1
-                    else:
-                        # Keep for retry if data not available yet
-                        remaining_evals.append(entry)
-                else:
-                    # Not time to evaluate yet
-                    remaining_evals.append(entry)
-            except Exception as e:
-                print(f"   Error evaluating entry: {e}")
+        eval_ts = np.array([int(t.timestamp()) for t in eval_times], dtype=np.int64)
+        bar_idx = np.searchsorted(rates['time'], eval_ts, side='right') - 1
+        closes = rates['close']
+
+        resolved = []
+        for (row_id, entry), idx in zip(due, bar_idx):
+            # Keep for retry until the data is available or retention expires
+            if idx < 0:
                 continue
+            if entry['timeframe'] in self.ensemble_scorer.timeframes:
+                self.ensemble_scorer.record(entry['timeframe'], entry['predictions'], float(closes[idx]))
+            resolved.append(row_id)
+        evaluated_count = len(resolved)
 
-        print(f"   Evaluated {evaluated_count} predictions. {len(remaining_evals)} remaining.")
+        self.evaluation_store.resolve(resolved)
+        print(f"   Evaluated {evaluated_count} predictions from one {len(rates)}-bar fetch ({fetch_ms:.0f}ms). "
+              f"{self.evaluation_store.count()} remaining.")
 
-        # Save remaining evaluations
-        with open(self.pending_eval_path, 'w') as f:
-            json.dump(remaining_evals, f, indent=2)
+    def _save_ensemble_state(self) -> None:
+        """
+        Snapshot the online ensemble state so a restart continues where it left off.
 
-    def update_ensemble_weights(self) -> None:
-        """Update ensemble weights based on past performance."""
-        if not self.ensemble_weights:
-            return
+        Holds the per-timeframe ensemble weights and error ring buffers, the
+        Kalman x/p state and the last smoothed predictions.  Written with
+        atomic_write() so a crash never leaves a torn snapshot.
+        """
+        state = {
+            'saved_at': datetime.now().isoformat(),
+            'method': 'multi-timeframe' if self.use_multitimeframe else 'single-timeframe',
+            'model_types': self.ensemble_model_types,
+            'ensemble_scorer': self.ensemble_scorer.state(),
+            'kalman': {tf_name: {'x': kf.x, 'p': kf.p} for tf_name, kf in self.kalman_filters.items()},
+            'previous_predictions': self.previous_predictions
+        }
+        try:
+            atomic_write(self.ensemble_state_path,
+                         json.dumps(state, separators=(',', ':'), default=float).encode())
+        except Exception as e:
+            print(f"Error saving ensemble state: {e}")
 
-        print("Updating ensemble weights...")
-        model_errors = [0.0] * self.num_ensemble_models
-        total_samples = 0
+    def _restore_ensemble_state(self) -> None:
+        """
+        Restore the snapshot written by _save_ensemble_state().
 
-        # Calculate average error for each model
-        for tf_history in self.prediction_history.values():
-            if not tf_history:
-                continue
-            for entry in tf_history:
-                actual = entry['actual']
-                for i, pred in enumerate(entry['predictions']):
-                    if i < len(model_errors):
-                        model_errors[i] += abs(pred - actual)
-                total_samples += 1
-
-        if total_samples < 5:
-            print("   Not enough evaluated predictions to update weights.")
+        Weights are only restored for the same ensemble members, and the
+        Kalman/EMA state only for the same prediction method.
+        """
+        try:
+            with open(self.ensemble_state_path, 'r') as f:
+                state = json.load(f)
+        except FileNotFoundError:
             return
-
-        # Better handling of zero division
-        avg_errors = [err / max(total_samples, 1) for err in model_errors]
-        
-        # FIXED: Use softmax-style weighting to prevent extreme weights
-        # This prevents any single model from dominating
-        min_error = min(avg_errors) if avg_errors else 1e-8
-        normalized_errors = [(err / min_error) for err in avg_errors]
-        
-        # Apply temperature scaling to control weight distribution
-        temperature = 2.0  # Higher = more equal weights, lower = more extreme
-        exp_neg_errors = [np.exp(-err / temperature) for err in normalized_errors]
-        total_exp = sum(exp_neg_errors)
-
-        if total_exp == 0:
-            print("   WARNING: All weights are zero, keeping equal weights")
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Ensemble state unreadable ({e}), starting fresh")
             return
 
-        new_weights = [e / total_exp for e in exp_neg_errors]
+        restored = []
+        if (state.get('model_types') == self.ensemble_model_types
+                and self.ensemble_scorer.load_state(state.get('ensemble_scorer', {}))):
+            restored.append(f"weights and {int(self.ensemble_scorer.sample_counts().sum())} evaluated predictions")
+
+        method = 'multi-timeframe' if self.use_multitimeframe else 'single-timeframe'
+        if state.get('method') == method:
+            for tf_name, kf_state in state.get('kalman', {}).items():
+                if tf_name in self.kalman_filters:
+                    self.kalman_filters[tf_name].x = kf_state['x']
+                    self.kalman_filters[tf_name].p = kf_state['p']
+            for tf_name, prediction in state.get('previous_predictions', {}).items():
+                if tf_name in self.previous_predictions:
+                    self.previous_predictions[tf_name] = prediction
+            restored.append('Kalman state')
+
+        if restored:
+            print(f"Restored ensemble state from {state.get('saved_at')}: {', '.join(restored)}")
+
+    def _reset_ensemble_scorer(self) -> None:
+        """Start uniform per-timeframe weights for the current ensemble members."""
+        self.num_ensemble_models = len(self.ensemble_model_types)
+        self.ensemble_scorer = EnsembleScorer(list(self.kalman_config.keys()), self.num_ensemble_models,
+                                              window=self.ensemble_lookback,
+                                              learning_rate=self.ensemble_learning_rate)
 
-        # Smooth weight updates
-        self.ensemble_weights = [
-            (1 - self.ensemble_learning_rate) * old_w + self.ensemble_learning_rate * new_w
-            for old_w, new_w in zip(self.ensemble_weights, new_weights)
-        ]
+    def update_ensemble_weights(self) -> None:
+        """Update each timeframe's ensemble weights from its recent prediction errors."""
+        if not self.num_ensemble_models:
+            return
 
-        # Normalize weights (just in case)
-        weight_sum = sum(self.ensemble_weights)
-        if weight_sum > 0:
-            self.ensemble_weights = [w / weight_sum for w in self.ensemble_weights]
+        print("Updating ensemble weights...")
+        avg_errors, updated = self.ensemble_scorer.update()
+        if not updated.any():
+            print("   Not enough evaluated predictions to update weights.")
+            return
 
-        print(f"   Avg errors: {[f'{e:.6f}' for e in avg_errors]}")
-        print(f"   New weights: {[f'{w:.3f}' for w in self.ensemble_weights]}")
+        for row, tf_name in enumerate(self.ensemble_scorer.timeframes):
+            if updated[row]:
+                print(f"   {tf_name}: avg errors {[f'{e:.6f}' for e in avg_errors[row]]} -> "
+                      f"weights {[f'{w:.3f}' for w in self.ensemble_scorer.weights[row]]}")
 
-    def run_safe_backtest(self):
+    def run_safe_backtest(self, workers: int = 1):
         """
         Walk-Forward Backtester.
         Fixes the 'Read-Ahead' cheating problem.
+
+        Args:
+            workers: Number of worker processes to shard the folds across
         """
         print("\n" + "=" * 80)
         print("Starting Safe Backtest (Walk-Forward Anti-Leakage)")
@@ -2048,31 +3892,151 @@ class UnifiedLSTMPredictor:
         
         # Only use timeframes the EA supports
         timeframes = {"1H": 1, "4H": 4, "1D": 24}
-        results = {tf: {'timestamps': [], 'actual': [], 'predicted': []} for tf in timeframes.keys()}
         
-        total_iterations = (len(df_full) - window - 1) // step
-        print(f"\nTotal iterations: {total_iterations}")
+        # Keep only folds inside the requested prediction window
+        fold_idx = np.arange(window, len(df_full) - 1, step)
+        fold_times = df_selected.index[fold_idx]
+        in_window = np.ones(len(fold_idx), dtype=bool)
+        if self.predict_start:
+            in_window &= fold_times >= self.predict_start
+        if self.predict_end:
+            in_window &= fold_times <= self.predict_end
+        fold_idx = fold_idx[in_window]
+
+        print(f"\nTotal iterations: {len(fold_idx)}")
         print(f"Training window: {window} bars")
         print(f"Step size: {step} bars\n")
 
-        iteration = 0
-        for i in range(window, len(df_full) - 1, step):
-            iteration += 1
-            
+        # LightGBM uses unscaled lag features, so every fold can be predicted up
+        # front with one call per model instead of rebuilding the lags per fold
+        lgbm_log_returns: Dict[Tuple[str, str], np.ndarray] = {}
+        if use_multitf and len(fold_idx) > 0:
+            df_tabular = None
+            for tf_name in timeframes.keys():
+                for model_name, model in self.models_by_timeframe.get(tf_name, {}).items():
+                    if 'lgbm' not in model_name:
+                        continue
+                    if df_tabular is None:
+                        df_tabular = self._build_tabular_lag_frame(df_selected)[0].ffill()
+                    try:
+                        lgbm_log_returns[(tf_name, model_name)] = self._predict_lgbm_batched(model, df_tabular, fold_idx)
+                    except Exception as e:
+                        print(f"WARNING: {model_name} failed for {tf_name}: {e}")
+
+        results = None
+        if workers > 1 and len(fold_idx) > 1:
+            results = self._run_safe_backtest_parallel(df_selected, fold_idx, use_multitf,
+                                                       lgbm_log_returns, timeframes, workers)
+        if results is None:
+            results = self._run_safe_backtest_folds(df_selected, fold_idx, use_multitf,
+                                                    lgbm_log_returns, timeframes)
+
+        # Combine the per-model prices with walk-forward ensemble weights
+        closes = df_selected['close'].values
+        for tf_name, steps in timeframes.items():
+            data = results[tf_name]
+            rows = data.pop('model_prices')
+            if not rows:
+                data['predicted'] = []
+                continue
+            model_prices = list(np.array(rows, dtype=np.float64).T)
+            pred_pos = df_selected.index.get_indexer(data['timestamps'])
+            weights = self._walk_forward_weights(model_prices, closes, pred_pos, steps)
+            data['predicted'] = list(self._combine_ensemble_prices(model_prices, closes[pred_pos], weights))
+        
+        # Calculate and display metrics
+        print("\n" + "=" * 80)
+        print("SAFE BACKTEST RESULTS (No Look-Ahead Bias)")
+        print("=" * 80)
+        
+        for tf_name in timeframes.keys():
+            if len(results[tf_name]['predicted']) > 0:
+                predicted = np.array(results[tf_name]['predicted'])
+                actual = np.array(results[tf_name]['actual'])
+                
+                # Calculate metrics
+                mae = np.mean(np.abs(predicted - actual))
+                mape = np.mean(np.abs((actual - predicted) / actual)) * 100
+                rmse = np.sqrt(np.mean((predicted - actual) ** 2))
+                
+                # Directional accuracy
+                pred_direction = np.sign(np.diff(predicted))
+                actual_direction = np.sign(np.diff(actual))
+                directional_accuracy = np.mean(pred_direction == actual_direction) * 100
+                
+                print(f"\n{tf_name} Timeframe:")
+                print(f"  MAE:  {mae:.5f}")
+                print(f"  MAPE: {mape:.2f}%")
+                print(f"  RMSE: {rmse:.5f}")
+                print(f"  Directional Accuracy: {directional_accuracy:.2f}%")
+        
+        # Export results to CSV
+        self.export_safe_backtest_results(results)
+        print("\n" + "=" * 80)
+        print("SAFE BACKTEST COMPLETE!")
+        print("=" * 80)
+
+    def _run_safe_backtest_folds(self, df_selected: pd.DataFrame, fold_idx: np.ndarray, use_multitf: bool,
+                                 lgbm_log_returns: Dict[Tuple[str, str], np.ndarray],
+                                 timeframes: Dict[str, int], label: str = "") -> Dict[str, Dict[str, List]]:
+        """
+        Run the walk-forward predictions for a contiguous run of folds.
+
+        Each fold only sees rows before its own bar, so any contiguous slice of
+        folds can be processed independently once the expanding statistics are
+        seeded with the rows preceding the first fold.
+
+        Args:
+            df_selected: Selected features plus targets and close
+            fold_idx: Ascending positional indices of the bars to predict
+            use_multitf: Use models_by_timeframe instead of the single-timeframe models
+            lgbm_log_returns: Precomputed LightGBM predictions aligned with fold_idx
+            timeframes: Timeframe name -> horizon in bars
+            label: Prefix for progress lines (used by worker processes)
+
+        Returns:
+            Per-timeframe dict of timestamps, actual prices and per-model predicted prices
+        """
+        results = {tf: {'timestamps': [], 'actual': [], 'model_prices': []} for tf in timeframes.keys()}
+
+        # Expanding-window robust statistics: each fold only adds the bars since the
+        # previous fold instead of refitting RobustScaler on the whole prefix.
+        # All feature scalers were refit on the same past rows, so one engine
+        # serves every timeframe.
+        features_raw = df_selected[self.feature_cols].values
+        feature_stats = ExpandingRobustScaler()
+        # Timeframes served by the single-timeframe fallback need the target statistics too
+        fallback_tfs = [tf_name for tf_name in timeframes
+                        if not use_multitf or tf_name not in self.models_by_timeframe]
+        if use_multitf:
+            for tf_name in fallback_tfs:
+                if self.models:
+                    print(f"{label}WARNING: No {tf_name} models loaded, using the single-timeframe models")
+                else:
+                    print(f"{label}WARNING: No {tf_name} models loaded, skipping {tf_name}")
+        target_stats = ExpandingRobustScaler() if fallback_tfs else None
+        target_raw = df_selected[[self.target_column]].values
+        fitted_upto = 0
+
+        for pos, i in enumerate(fold_idx):
             # Training only on past data (NO FUTURE LEAKAGE)
-            past = df_full.iloc[:i]
+            feature_stats.partial_fit(features_raw[fitted_upto:i])
+            if target_stats is not None:
+                target_stats.partial_fit(target_raw[fitted_upto:i])
+            fitted_upto = i
             current_idx = i
             
             # Get current price and timestamp
             current_price = df_selected['close'].iloc[current_idx]
             timestamp = df_selected.index[current_idx]
 
-            # Skip bars outside the requested prediction window
-            ts_dt = timestamp.to_pydatetime() if hasattr(timestamp, 'to_pydatetime') else timestamp
-            if self.predict_start and ts_dt < self.predict_start:
-                continue
-            if self.predict_end and ts_dt > self.predict_end:
-                break
+            # Scale only the lookback rows needed for this fold
+            X_pred_seq = None
+            if current_idx >= self.lookback_periods:
+                X_pred_seq = feature_stats.transform(
+                    features_raw[current_idx - self.lookback_periods:current_idx]
+                ).reshape(1, self.lookback_periods, len(self.feature_cols))
+                X_pred_seq = self._sequence_input(X_pred_seq)
             
             # Make predictions for each timeframe
             for tf_name, steps in timeframes.items():
@@ -2083,122 +4047,110 @@ class UnifiedLSTMPredictor:
                     models = self.models_by_timeframe[tf_name]
                     feature_scaler, target_scaler = self.scalers_by_timeframe[tf_name]
                     
-                    # Refit scalers ONLY on past data (prevents look-ahead)
-                    feature_scaler.fit(past[self.feature_cols])
-                    
-                    # Scale features
-                    features_scaled = feature_scaler.transform(df_selected[self.feature_cols].iloc[:i+1].values)
-                    
-                    if current_idx >= self.lookback_periods:
-                        X_pred_seq = features_scaled[current_idx - self.lookback_periods:current_idx].reshape(
-                            1, self.lookback_periods, len(self.feature_cols)
-                        )
-                        X_pred_seq = tf.convert_to_tensor(X_pred_seq, dtype=tf.float32)
-                        
+                    if X_pred_seq is not None:
                         for model_name, model in models.items():
                             try:
                                 if 'lgbm' in model_name:
-                                    # Prepare tabular data
-                                    df_tabular = df_selected.iloc[:i+1].copy()
-                                    for col in self.feature_cols:
-                                        for lag in [1, 3, 5, 10]:
-                                            new_col = f'{col}_lag_{lag}'
-                                            df_tabular[new_col] = df_tabular[col].shift(lag)
-                                    df_tabular.ffill(inplace=True)
-                                    
-                                    if timestamp in df_tabular.index:
-                                        X_pred_tab = df_tabular.loc[timestamp][model.feature_name_].values.reshape(1, -1)
-                                        pred_log_return = model.predict(X_pred_tab)[0]
-                                    else:
+                                    if (tf_name, model_name) not in lgbm_log_returns:
+                                        ensemble_preds.append(np.nan)
                                         continue
+                                    pred_log_return = lgbm_log_returns[(tf_name, model_name)][pos]
                                 else:
                                     pred_log_return_scaled = model(X_pred_seq, training=False).numpy()[0][0]
                                     pred_log_return = target_scaler.inverse_transform([[pred_log_return_scaled]])[0][0]
                                 
                                 # NO SCALING - multi-TF models predict for their specific timeframe
                                 predicted_price = current_price * np.exp(pred_log_return)
-                                
-                                if not np.isnan(predicted_price) and not np.isinf(predicted_price):
-                                    ensemble_preds.append(predicted_price)
+                                ensemble_preds.append(predicted_price)
                             except Exception:
-                                continue
+                                ensemble_preds.append(np.nan)
                 else:
                     # Fallback: single-timeframe models with scaling
-                    self.feature_scaler.fit(past[self.feature_cols])
-                    self.target_scaler.fit(past[[self.target_column]])
-                    
-                    features_scaled = self.feature_scaler.transform(df_selected[self.feature_cols].iloc[:i+1].values)
-                    
-                    if current_idx >= self.lookback_periods:
-                        X_pred_seq = features_scaled[current_idx - self.lookback_periods:current_idx].reshape(
-                            1, self.lookback_periods, len(self.feature_cols)
-                        )
-                        X_pred_seq = tf.convert_to_tensor(X_pred_seq, dtype=tf.float32)
-                        
+                    if X_pred_seq is not None:
                         for model_name, model in self.models.items():
                             try:
                                 if 'lgbm' in model_name:
                                     continue  # Skip LGBM for simplicity
                                 else:
                                     pred_log_return_scaled = model(X_pred_seq, training=False).numpy()[0][0]
-                                    pred_log_return = self.target_scaler.inverse_transform([[pred_log_return_scaled]])[0][0]
+                                    pred_log_return = target_stats.inverse_transform([[pred_log_return_scaled]])[0][0]
                                 
                                 # Scale by sqrt(steps) for single-TF models
                                 steps_adjusted = np.sqrt(steps) if steps > 1 else steps
                                 predicted_price = current_price * np.exp(pred_log_return * steps_adjusted)
-                                
-                                if not np.isnan(predicted_price) and not np.isinf(predicted_price):
-                                    ensemble_preds.append(predicted_price)
+                                ensemble_preds.append(predicted_price)
                             except Exception:
-                                continue
-                
-                if ensemble_preds:
-                    weighted_price = np.mean(ensemble_preds)
-                    
+                                ensemble_preds.append(np.nan)
+
+                # Per-model prices (NaN = no prediction); weighted after all folds are in
+                if np.isfinite(ensemble_preds).any():
                     # Get actual future price (if available)
                     future_idx = min(current_idx + steps, len(df_selected) - 1)
                     actual_price = df_selected['close'].iloc[future_idx]
                     
                     results[tf_name]['timestamps'].append(timestamp)
-                    results[tf_name]['predicted'].append(weighted_price)
+                    results[tf_name]['model_prices'].append(ensemble_preds)
                     results[tf_name]['actual'].append(actual_price)
             
             # Progress indicator
+            iteration = pos + 1
             if iteration % 10 == 0 or iteration == 1:
-                progress = (iteration / total_iterations) * 100
-                print(f"Progress: {progress:.1f}% | Bar: {timestamp} | Price: {current_price:.5f}")
-        
-        # Calculate and display metrics
-        print("\n" + "=" * 80)
-        print("SAFE BACKTEST RESULTS (No Look-Ahead Bias)")
-        print("=" * 80)
-        
+                progress = (iteration / len(fold_idx)) * 100
+                print(f"{label}Progress: {progress:.1f}% | Bar: {timestamp} | Price: {current_price:.5f}")
+
+        return results
+
+    def _run_safe_backtest_parallel(self, df_selected: pd.DataFrame, fold_idx: np.ndarray, use_multitf: bool,
+                                    lgbm_log_returns: Dict[Tuple[str, str], np.ndarray],
+                                    timeframes: Dict[str, int], workers: int) -> Optional[Dict[str, Dict[str, List]]]:
+        """
+        Shard the walk-forward folds across a process pool.
+
+        Folds are split into contiguous shards; each worker loads the models
+        once and runs _run_safe_backtest_folds() on its shard.  Results are
+        merged back in timestamp order.
+
+        Returns:
+            Merged results, or None if the pool could not be used
+        """
+        workers = min(workers, len(fold_idx))
+        shards = [s for s in np.array_split(np.arange(len(fold_idx)), workers) if len(s) > 0]
+        intra_op_threads = max(1, (os.cpu_count() or 1) // workers)
+        predictor_args = {'symbol': self.symbol, 'ensemble_model_types': self.ensemble_model_types}
+        print(f"Running {len(fold_idx)} folds on {len(shards)} worker processes "
+              f"({intra_op_threads} TF threads each)...")
+
+        start = time.time()
+        try:
+            # spawn: forking a process that already initialised TensorFlow is unsafe
+            with ProcessPoolExecutor(max_workers=len(shards), mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_safe_backtest_worker_init,
+                                     initargs=(predictor_args, use_multitf, df_selected, intra_op_threads)) as pool:
+                futures = [
+                    pool.submit(_safe_backtest_worker_run, fold_idx[shard],
+                                {key: preds[shard] for key, preds in lgbm_log_returns.items()},
+                                timeframes, f"[worker {n + 1}/{len(shards)}] ")
+                    for n, shard in enumerate(shards)
+                ]
+                shard_results = [future.result() for future in futures]
+        except Exception as e:
+            print(f"WARNING: Parallel safe backtest failed ({e}), falling back to a single process")
+            return None
+
+        results = {tf: {'timestamps': [], 'actual': [], 'model_prices': []} for tf in timeframes.keys()}
         for tf_name in timeframes.keys():
-            if len(results[tf_name]['predicted']) > 0:
-                predicted = np.array(results[tf_name]['predicted'])
-                actual = np.array(results[tf_name]['actual'])
-                
-                # Calculate metrics
-                mae = np.mean(np.abs(predicted - actual))
-                mape = np.mean(np.abs((actual - predicted) / actual)) * 100
-                rmse = np.sqrt(np.mean((predicted - actual) ** 2))
-                
-                # Directional accuracy
-                pred_direction = np.sign(np.diff(predicted))
-                actual_direction = np.sign(np.diff(actual))
-                directional_accuracy = np.mean(pred_direction == actual_direction) * 100
-                
-                print(f"\n{tf_name} Timeframe:")
-                print(f"  MAE:  {mae:.5f}")
-                print(f"  MAPE: {mape:.2f}%")
-                print(f"  RMSE: {rmse:.5f}")
-                print(f"  Directional Accuracy: {directional_accuracy:.2f}%")
-        
-        # Export results to CSV
-        self.export_safe_backtest_results(results)
-        print("\n" + "=" * 80)
-        print("SAFE BACKTEST COMPLETE!")
-        print("=" * 80)
+            rows = []
+            for shard_result in shard_results:
+                data = shard_result[tf_name]
+                rows.extend(zip(data['timestamps'], data['actual'], data['model_prices']))
+            rows.sort(key=lambda row: row[0])
+            for timestamp, actual, model_prices in rows:
+                results[tf_name]['timestamps'].append(timestamp)
+                results[tf_name]['actual'].append(actual)
+                results[tf_name]['model_prices'].append(model_prices)
+
+        print(f"Parallel walk-forward finished in {time.time() - start:.1f}s")
+        return results
 
     def export_safe_backtest_results(self, results: Dict[str, Dict[str, List]]) -> None:
         """Export safe backtest results to CSV files."""
@@ -2222,8 +4174,113 @@ class UnifiedLSTMPredictor:
                 except Exception as e:
                     print(f"   Error creating {output_file}: {e}")
 
-    def run_backtest_generation(self) -> None:
-        """Generate historical predictions for backtesting."""
+    def _build_lookback_windows(self, features_scaled: np.ndarray) -> np.ndarray:
+        """
+        Build every lookback window over a scaled feature matrix as a strided view.
+
+        Window ``j`` covers rows ``j .. j + lookback - 1``, so the input for bar ``i``
+        (which must not include bar ``i`` itself) is ``windows[i - lookback]``.
+        No data is copied until a batch of windows is actually selected.
+
+        Args:
+            features_scaled: Scaled feature matrix of shape (bars, features)
+
+        Returns:
+            Read-only view of shape (bars - lookback + 1, lookback, features)
+        """
+        windows = np.lib.stride_tricks.sliding_window_view(
+            features_scaled, (self.lookback_periods, features_scaled.shape[1])
+        )
+        return windows[:, 0]
+
+    def _predict_dl_batched(self, model: Any, windows: np.ndarray, bar_idx: np.ndarray,
+                            target_scaler: RobustScaler, batch_size: int = 1024) -> np.ndarray:
+        """
+        Run a Keras model over many bars in large batches.
+
+        Args:
+            model: Loaded Keras model
+            windows: Output of _build_lookback_windows()
+            bar_idx: Positional indices of the bars to predict
+            target_scaler: Scaler used to invert the model output
+            batch_size: Number of windows per forward pass
+
+        Returns:
+            Predicted log returns, one per entry in bar_idx
+        """
+        scaled = np.empty(len(bar_idx), dtype=np.float64)
+        for start in range(0, len(bar_idx), batch_size):
+            chunk_idx = bar_idx[start:start + batch_size] - self.lookback_periods
+            X_batch = self._sequence_input(windows[chunk_idx])
+            # Direct call (not model.predict) to avoid retracing for every chunk
+            scaled[start:start + len(chunk_idx)] = model(X_batch, training=False).numpy()[:, 0]
+        return target_scaler.inverse_transform(scaled.reshape(-1, 1))[:, 0]
+
+    def _walk_forward_weights(self, model_prices: List[np.ndarray], closes: np.ndarray,
+                              pred_pos: np.ndarray, steps: int) -> Optional[np.ndarray]:
+        """
+        Per-bar ensemble weights for a backtest, as the live scorer would have learned them.
+
+        Args:
+            model_prices: One price array per model, aligned with pred_pos
+            closes: Close of every bar in the frame
+            pred_pos: Ascending positions of the predicted bars
+            steps: Horizon in bars; a prediction is scored against the close steps bars later
+
+        Returns:
+            (bars x model) weights, or None without models
+        """
+        if not model_prices:
+            return None
+        target_pos = pred_pos + steps
+        actual = np.where(target_pos < len(closes), closes[np.minimum(target_pos, len(closes) - 1)], np.nan)
+        return self.ensemble_scorer.walk_forward_weights(np.column_stack(model_prices), actual,
+                                                         pred_pos, target_pos)
+
+    @staticmethod
+    def _ensemble_dispersion(model_prices: List[np.ndarray], n_bars: int) -> np.ndarray:
+        """Per-bar standard deviation of the valid member prices (0 where none are valid)."""
+        if not model_prices:
+            return np.zeros(n_bars)
+        stacked = np.column_stack(model_prices)
+        valid = np.isfinite(stacked)
+        counts = np.maximum(valid.sum(axis=1), 1)
+        mean = np.where(valid, stacked, 0.0).sum(axis=1) / counts
+        deviations = np.where(valid, stacked - mean[:, None], 0.0)
+        return np.sqrt((deviations ** 2).sum(axis=1) / counts)
+
+    @staticmethod
+    def _combine_ensemble_prices(model_prices: List[np.ndarray], fallback: np.ndarray,
+                                 weights: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Weighted average of per-model price arrays bar by bar, ignoring NaN/inf entries.
+
+        Bars where no model produced a valid price fall back to ``fallback``
+        (normally the current close), matching the per-bar generator.
+
+        Args:
+            model_prices: One price array per model
+            fallback: Price used where no model is valid
+            weights: Per-model weights, either one vector or one row per bar (default: equal)
+        """
+        if not model_prices:
+            return fallback.copy()
+        stacked = np.column_stack(model_prices)
+        if weights is None:
+            weights = np.ones(stacked.shape[1])
+        weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), stacked.shape)
+        return EnsembleScorer.combine(stacked, weights, fallback)
+
+    def run_backtest_generation(self, batch_size: int = 1024) -> None:
+        """
+        Generate historical predictions for backtesting.
+
+        Features are scaled once per timeframe and every lookback window is
+        fed to the models in large batches instead of one bar at a time.
+
+        Args:
+            batch_size: Number of bars per deep learning forward pass
+        """
         print("\n" + "=" * 60)
         print("Starting Backtest Generation...")
         print("=" * 60)
@@ -2266,109 +4323,151 @@ class UnifiedLSTMPredictor:
 
         # Only generate for timeframes the EA supports
         timeframes = {"1H": 1, "4H": 4, "1D": 24}
-        all_predictions = {tf: [] for tf in timeframes.keys()}
-        timestamps = []
-
-        print(f"Generating predictions for {len(df_selected) - self.lookback_periods} bars...")
-
-        for i in range(self.lookback_periods, len(df_selected)):
-            current_price = df_selected['close'].iloc[i]
-            timestamp = df_selected.index[i]
+        all_predictions = {}
+        all_change_pct = {}
+        all_ensemble_std = {}
+
+        # --- Select bars inside the requested prediction window ---
+        bar_idx = np.arange(self.lookback_periods, len(df_selected))
+        bar_times = df_selected.index[bar_idx]
+        in_window = np.ones(len(bar_idx), dtype=bool)
+        if self.predict_start:
+            in_window &= bar_times >= self.predict_start
+        if self.predict_end:
+            in_window &= bar_times <= self.predict_end
+        bar_idx = bar_idx[in_window]
+        timestamps = list(df_selected.index[bar_idx])
+        current_prices = df_selected['close'].values[bar_idx]
+
+        print(f"Generating predictions for {len(bar_idx)} bars (batch size {batch_size})...")
+        if len(bar_idx) == 0:
+            print("ERROR: No bars inside the prediction window.")
+            return
 
-            # --- Skip bars outside the requested prediction window ---
-            ts_dt = timestamp.to_pydatetime() if hasattr(timestamp, 'to_pydatetime') else timestamp
-            if self.predict_start and ts_dt < self.predict_start:
-                continue
-            if self.predict_end and ts_dt > self.predict_end:
-                break
+        features_raw = df_selected[self.feature_cols].values
+        df_tabular = None
+        single_tf_log_returns = None
 
-            # Get predictions for each timeframe
-            for tf_name, steps in timeframes.items():
-                ensemble_preds = []
-                
-                if use_multitf and tf_name in self.models_by_timeframe:
-                    # Use multi-timeframe models (NO SCALING!)
-                    models = self.models_by_timeframe[tf_name]
-                    feature_scaler, target_scaler = self.scalers_by_timeframe[tf_name]
-                    
-                    # Scale features
-                    features_scaled = feature_scaler.transform(df_selected[self.feature_cols].values)
-                    X_pred_seq = features_scaled[i - self.lookback_periods:i].reshape(
-                        1, self.lookback_periods, len(self.feature_cols)
-                    )
-                    X_pred_seq = tf.convert_to_tensor(X_pred_seq, dtype=tf.float32)
-                    
-                    for model_name, model in models.items():
-                        try:
-                            if 'lgbm' in model_name:
-                                # Prepare tabular data for LightGBM
-                                df_tabular = df_selected.iloc[:i+1].copy()
-                                for col in self.feature_cols:
-                                    for lag in [1, 3, 5, 10]:
-                                        new_col = f'{col}_lag_{lag}'
-                                        df_tabular[new_col] = df_tabular[col].shift(lag)
-                                df_tabular.ffill(inplace=True)
-                                
-                                if timestamp in df_tabular.index:
-                                    X_pred_tab = df_tabular.loc[timestamp][model.feature_name_].values.reshape(1, -1)
-                                    pred_log_return = model.predict(X_pred_tab)[0]
-                                else:
-                                    continue
-                            else:
-                                pred_log_return_scaled = model(X_pred_seq, training=False).numpy()[0][0]
-                                pred_log_return = target_scaler.inverse_transform([[pred_log_return_scaled]])[0][0]
-                            
-                            # NO SCALING by steps - multi-TF models already predict for their timeframe
-                            predicted_price = current_price * np.exp(pred_log_return)
-                            
-                            if not np.isnan(predicted_price) and not np.isinf(predicted_price):
-                                ensemble_preds.append(predicted_price)
-                        except Exception:
-                            continue
-                else:
-                    # Fallback: single-timeframe models with scaling
-                    features_scaled = self.feature_scaler.transform(df_selected[self.feature_cols].values)
-                    X_pred_seq = features_scaled[i - self.lookback_periods:i].reshape(
-                        1, self.lookback_periods, len(self.feature_cols)
-                    )
-                    X_pred_seq = tf.convert_to_tensor(X_pred_seq, dtype=tf.float32)
-                    
+        for tf_name, steps in timeframes.items():
+            tf_start = time.time()
+            model_prices = []
+
+            if use_multitf and tf_name in self.models_by_timeframe:
+                # Use multi-timeframe models (NO SCALING!)
+                models = self.models_by_timeframe[tf_name]
+                feature_scaler, target_scaler = self.scalers_by_timeframe[tf_name]
+                windows = self._build_lookback_windows(feature_scaler.transform(features_raw))
+
+                for model_name, model in models.items():
+                    try:
+                        if 'lgbm' in model_name:
+                            if df_tabular is None:
+                                df_tabular = self._build_tabular_lag_frame(df_selected)[0].ffill()
+                            log_returns = self._predict_lgbm_batched(model, df_tabular, bar_idx)
+                        else:
+                            log_returns = self._predict_dl_batched(model, windows, bar_idx, target_scaler, batch_size)
+                    except Exception as e:
+                        print(f"   WARNING: {model_name} failed for {tf_name}: {e}")
+                        # Keep the slot so weights stay aligned with the models
+                        model_prices.append(np.full(len(bar_idx), np.nan))
+                        continue
+                    # NO SCALING by steps - multi-TF models already predict for their timeframe
+                    model_prices.append(current_prices * np.exp(log_returns))
+            else:
+                # Fallback: single-timeframe models with scaling.  The model outputs
+                # don't depend on the timeframe, so run them once and reuse.
+                if single_tf_log_returns is None:
+                    single_tf_log_returns = []
+                    windows = self._build_lookback_windows(self.feature_scaler.transform(features_raw))
                     for model_name, model in self.models.items():
+                        if 'lgbm' in model_name:
+                            continue  # Skip LGBM for simplicity in fallback mode
                         try:
-                            if 'lgbm' in model_name:
-                                continue  # Skip LGBM for simplicity in fallback mode
-                            else:
-                                pred_log_return_scaled = model(X_pred_seq, training=False).numpy()[0][0]
-                                pred_log_return = self.target_scaler.inverse_transform([[pred_log_return_scaled]])[0][0]
-                            
-                            # Scale by sqrt(steps) for single-TF models
-                            steps_adjusted = np.sqrt(steps) if steps > 1 else steps
-                            predicted_price = current_price * np.exp(pred_log_return * steps_adjusted)
-                            
-                            if not np.isnan(predicted_price) and not np.isinf(predicted_price):
-                                ensemble_preds.append(predicted_price)
-                        except Exception:
-                            continue
-
-                if ensemble_preds:
-                    weighted_price = np.mean(ensemble_preds)
-                    all_predictions[tf_name].append(weighted_price)
-                else:
-                    all_predictions[tf_name].append(current_price)
+                            single_tf_log_returns.append(
+                                self._predict_dl_batched(model, windows, bar_idx, self.target_scaler, batch_size)
+                            )
+                        except Exception as e:
+                            print(f"   WARNING: {model_name} failed: {e}")
 
-            timestamps.append(timestamp)
+                # Scale by sqrt(steps) for single-TF models
+                steps_adjusted = np.sqrt(steps) if steps > 1 else steps
+                model_prices = [current_prices * np.exp(lr * steps_adjusted) for lr in single_tf_log_returns]
 
-            # Progress indicator
-            if (i - self.lookback_periods) % 500 == 0:
-                progress = ((i - self.lookback_periods) / (len(df_selected) - self.lookback_periods)) * 100
-                print(f"   Progress: {progress:.1f}%")
+            weights = self._walk_forward_weights(model_prices, df_selected['close'].values, bar_idx, steps)
+            all_predictions[tf_name] = self._combine_ensemble_prices(model_prices, current_prices, weights)
+            # Same confidence columns the live cycle publishes: change vs. the bar's close and
+            # the spread of the member prices (population std over the valid models)
+            all_change_pct[tf_name] = (all_predictions[tf_name] - current_prices) / current_prices * 100.0
+            all_ensemble_std[tf_name] = self._ensemble_dispersion(model_prices, len(bar_idx))
+            print(f"   {tf_name}: {len(bar_idx)} bars from {len(model_prices)} models in {time.time() - tf_start:.1f}s")
 
         # Export backtest files
-        self.export_backtest_files(timestamps, all_predictions)
+        self.export_backtest_files(timestamps, all_predictions, all_change_pct, all_ensemble_std)
         print("\nBACKTEST GENERATION COMPLETE!")
 
-    def export_backtest_files(self, timestamps: List, predictions: Dict[str, List[float]]) -> None:
-        """Export backtest predictions to CSV files."""
+    @staticmethod
+    def _format_lookup_csv(timestamps: List, pred_values: List[float],
+                           change_pct: Optional[np.ndarray] = None,
+                           ensemble_std: Optional[np.ndarray] = None) -> bytes:
+        """
+        Lookup CSV contents for one timeframe, formatted in one pass.
+
+        Timestamps are rendered by NumPy for the whole column instead of one
+        strftime per row; lines end with os.linesep like a text-mode write.
+        """
+        stamps = np.datetime_as_string(pd.DatetimeIndex(timestamps).values.astype('datetime64[m]'), unit='m')
+        # 'YYYY-MM-DDTHH:MM' -> 'YYYY.MM.DD HH:MM' on the joined column, then split back into rows
+        stamps = '\n'.join(stamps).replace('-', '.').replace('T', ' ').split('\n') if len(stamps) else []
+        if change_pct is not None and ensemble_std is not None:
+            header = 'timestamp,prediction,change_pct,ensemble_std'
+            rows = map('%s,%.5f,%.3f,%.5f'.__mod__, zip(stamps, pred_values, change_pct, ensemble_std))
+        else:
+            header = 'timestamp,prediction'
+            rows = map('%s,%.5f'.__mod__, zip(stamps, pred_values))
+        return os.linesep.join([header, *rows, '']).encode('ascii')
+
+    @staticmethod
+    def _build_binary_lookup(timestamps: List, pred_values: List[float],
+                             change_pct: Optional[np.ndarray] = None,
+                             ensemble_std: Optional[np.ndarray] = None) -> bytes:
+        """
+        Binary lookup file contents for one timeframe.
+
+        Values are rounded like the CSV columns so both formats drive the
+        tester identically.  Without change_pct/ensemble_std they are derived
+        exactly as the EA derives them from a two-column CSV (change vs. the
+        previous prediction, fixed 0.025 std).
+        """
+        records = np.zeros(len(pred_values), dtype=LOOKUP_RECORD_DTYPE)
+        records['timestamp'] = (pd.DatetimeIndex(timestamps) - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+        records['prediction'] = np.round(np.asarray(pred_values, dtype=np.float64), 5)
+        full_format = change_pct is not None and ensemble_std is not None
+        if full_format:
+            records['change_pct'] = np.round(np.asarray(change_pct, dtype=np.float64), 3)
+            records['ensemble_std'] = np.round(np.asarray(ensemble_std, dtype=np.float64), 5)
+        else:
+            records['ensemble_std'] = 0.025
+        records = records[(records['timestamp'] > 0) & (records['prediction'] > 0)]
+        records = records[np.argsort(records['timestamp'], kind='stable')]
+        if not full_format:
+            previous = records['prediction'][:-1]
+            records['change_pct'][1:] = (records['prediction'][1:] - previous) / previous * 100.0
+
+        first_ts = int(records['timestamp'][0]) if len(records) else 0
+        last_ts = int(records['timestamp'][-1]) if len(records) else 0
+        header = LOOKUP_HEADER.pack(LOOKUP_FILE_MAGIC, LOOKUP_FILE_VERSION, LOOKUP_RECORD_DTYPE.itemsize, 0,
+                                    len(records), first_ts, last_ts)
+        return header + records.tobytes()
+
+    def export_backtest_files(self, timestamps: List, predictions: Dict[str, List[float]],
+                              change_pct: Optional[Dict[str, np.ndarray]] = None,
+                              ensemble_std: Optional[Dict[str, np.ndarray]] = None) -> None:
+        """
+        Export backtest predictions to CSV files, plus binary lookups the EA loads in one read.
+
+        With change_pct and ensemble_std the CSVs use the EA's full format
+        (timestamp,prediction,change_pct,ensemble_std).
+        """
         print("\nExporting backtest files...")
         
         # Get the Common Files path for Strategy Tester
@@ -2383,30 +4482,27 @@ class UnifiedLSTMPredictor:
         except Exception as e:
             print(f"   Warning: Could not create Common Files folder: {e}")
         
+        destinations = [self.base_path, common_path] if common_path else [self.base_path]
         for tf_name, pred_values in predictions.items():
-            # Save to regular MQL5\Files folder
-            lookup_file = os.path.join(self.base_path, f'{self.symbol}_{tf_name}_lookup.csv')
-            try:
-                with open(lookup_file, 'w') as f:
-                    f.write('timestamp,prediction\n')  # Add header
-                    for ts, pred in zip(timestamps, pred_values):
-                        f.write(f'{ts.strftime("%Y.%m.%d %H:%M")},{pred:.5f}\n')
-                print(f"   Created: {lookup_file}")
-            except Exception as e:
-                print(f"   Error creating {lookup_file}: {e}")
-            
-            # ALSO save to Common Files folder for Strategy Tester
-            if common_path:
-                common_lookup_file = os.path.join(common_path, f'{self.symbol}_{tf_name}_lookup.csv')
-                try:
-                    with open(common_lookup_file, 'w') as f:
-                        f.write('timestamp,prediction\n')
-                        for ts, pred in zip(timestamps, pred_values):
-                            f.write(f'{ts.strftime("%Y.%m.%d %H:%M")},{pred:.5f}\n')
-                    print(f"   Created (Common): {common_lookup_file}")
-                except Exception as e:
-                    print(f"   Error creating Common file: {e}")
-        
+            tf_change = change_pct.get(tf_name) if change_pct else None
+            tf_std = ensemble_std.get(tf_name) if ensemble_std else None
+
+            # Serialise each format once, then write the same buffer to every destination
+            buffers = {
+                'csv': self._format_lookup_csv(timestamps, pred_values, tf_change, tf_std),
+                'bin': self._build_binary_lookup(timestamps, pred_values, tf_change, tf_std)
+            }
+            for ext, data in buffers.items():
+                for folder in destinations:
+                    lookup_file = os.path.join(folder, f'{self.symbol}_{tf_name}_lookup.{ext}')
+                    start = time.perf_counter()
+                    try:
+                        atomic_write(lookup_file, data)
+                        print(f"   Created: {lookup_file} ({len(data) / 1024:.0f} KB in "
+                              f"{(time.perf_counter() - start) * 1000:.0f} ms)")
+                    except Exception as e:
+                        print(f"   Error creating {lookup_file}: {e}")
+
         print("\n" + "=" * 60)
         print("BACKTEST FILES CREATED")
         print("=" * 60)
@@ -2417,30 +4513,180 @@ class UnifiedLSTMPredictor:
         print("=" * 60)
 
     def save_to_file(self, file_path: str, data: Dict) -> None:
-        """Save data to JSON file."""
+        """Save data to JSON file (atomically, the EA polls these files)."""
         try:
-            with open(file_path, 'w') as f:
-                json.dump(data, f, indent=4)
+            atomic_write(file_path, json.dumps(data, indent=4, default=float).encode('utf-8'))
         except Exception as e:
             print(f"Error saving to {file_path}: {e}")
 
-    def run_continuous(self, interval_minutes: int = 60) -> None:
+    def publish_binary_predictions(self, predictions: Dict[str, Dict[str, float]], current_price: float,
+                                   trade_allowed: bool) -> None:
+        """
+        Publish the cycle's predictions as one fixed-size binary record.
+
+        The sequence number grows with every publish so the EA can skip
+        unchanged records; the checksum lets it reject anything torn or stale.
+        Timeframes without a prediction are written as zeros.
         """
-        Run predictions continuously at specified intervals.
+        if self.output_sequence is None:
+            self.output_sequence = 0
+            try:
+                with open(self.binary_predictions_file, 'rb') as f:
+                    header = f.read(16)
+                if len(header) == 16:
+                    self.output_sequence = struct.unpack('<IIq', header)[2]
+            except OSError:
+                pass
+        self.output_sequence += 1
+
+        values = []
+        for key in ('prediction', 'change_pct', 'ensemble_std'):
+            values.extend(float(predictions.get(tf_name, {}).get(key, 0.0))
+                          for tf_name in PREDICTION_RECORD_TIMEFRAMES)
+        body = PREDICTION_RECORD.pack(PREDICTION_RECORD_MAGIC, PREDICTION_RECORD_VERSION, self.output_sequence,
+                                      int(time.time()), float(current_price), *values, int(bool(trade_allowed)))
+        try:
+            atomic_write(self.binary_predictions_file, body + struct.pack('<I', fnv1a_32(body)))
+        except Exception as e:
+            print(f"Error saving to {self.binary_predictions_file}: {e}")
+
+    def _latest_bar_time(self, tf_name: str) -> Optional[int]:
+        """Open time (broker clock, epoch seconds) of the newest bar of a timeframe."""
+        rates = self.data_source.copy_rates_from_pos(self.symbol, tf_name, 0, 1)
+        if rates is None or len(rates) == 0:
+            return None
+        return int(rates['time'][-1])
+
+    def _broker_now(self) -> Optional[datetime]:
+        """Current time on the broker clock, to the newest H1 bar's open, as a naive datetime."""
+        bar_open = self._latest_bar_time('H1')
+        if bar_open is None:
+            return None
+        return datetime.fromtimestamp(bar_open, tz=timezone.utc).replace(tzinfo=None)
+
+    def _wait_for_new_bar(self, tf_name: str, last_bar: Optional[int], offset: Optional[float],
+                          period: int, deadline_seconds: float, poll_seconds: float) -> Tuple[int, float]:
+        """
+        Block until a bar newer than last_bar appears in the broker feed.
+
+        With a known clock offset the wait sleeps until just before the
+        expected close and then polls; past the deadline (e.g. market closed)
+        polling backs off to every 30 seconds.
+
+        Returns:
+            Tuple of (new bar open time on the broker clock, local detection time)
+        """
+        deadline = None
+        if offset is not None and last_bar is not None:
+            expected_close = last_bar + period + offset
+            time.sleep(max(0.0, expected_close - poll_seconds - time.time()))
+            deadline = expected_close + deadline_seconds
+
+        warned = False
+        while True:
+            bar_open = self._latest_bar_time(tf_name)
+            if bar_open is not None and (last_bar is None or bar_open > last_bar):
+                return bar_open, time.time()
+            if deadline is not None and time.time() > deadline:
+                if not warned:
+                    print(f"   No new {tf_name} bar {deadline_seconds:.0f}s after the expected close "
+                          f"(market closed?), polling every 30s")
+                    warned = True
+                time.sleep(30)
+            else:
+                time.sleep(poll_seconds)
+
+    def _record_cycle_metrics(self, metrics: Dict[str, Any]) -> None:
+        """Append one cycle's lag metrics to scheduler_metrics_{symbol}.jsonl."""
+        try:
+            with open(self.scheduler_metrics_path, 'a') as f:
+                f.write(json.dumps(metrics) + "\n")
+        except Exception as e:
+            print(f"Error saving scheduler metrics: {e}")
+
+    def run_continuous(self, interval_minutes: int = 60, deadline_seconds: float = 30.0,
+                       poll_seconds: float = 1.0, prediction_method: Optional[Any] = None) -> None:
+        """
+        Run predictions continuously, one cycle per closed bar.
+
+        For 60/240/1440-minute intervals a cycle is triggered by the next
+        H1/H4/D1 bar appearing in the broker feed instead of a fixed sleep, so
+        cycles stay aligned to bar closes.  The offset between the broker's bar
+        clock and the local clock is learned from observed bar arrivals; the
+        scheduler sleeps until just before the next expected close and polls
+        the newest bar's open time.  Other intervals run on a fixed cadence
+        anchored to the start time.
 
         Args:
             interval_minutes: Minutes between prediction cycles
+            deadline_seconds: Target for publishing predictions after the bar close
+            poll_seconds: Polling period while waiting for a new bar
+            prediction_method: Callable run once per cycle (defaults to this
+                predictor's own prediction cycle)
         """
-        prediction_method = self.run_prediction_cycle_multitimeframe if self.use_multitimeframe else self.run_prediction_cycle
+        if prediction_method is None:
+            prediction_method = (self.run_prediction_cycle_multitimeframe if self.use_multitimeframe
+                                 else self.run_prediction_cycle)
+        tf_name = {60: 'H1', 240: 'H4', 1440: 'D1'}.get(interval_minutes)
+        period = interval_minutes * 60
 
         print(f"\nStarting Continuous Mode for {self.symbol} (Interval: {interval_minutes} mins)")
         print(f"Using {'multi-timeframe' if self.use_multitimeframe else 'single-timeframe'} prediction method")
-
+        if tf_name:
+            print(f"Cycles aligned to {tf_name} bar closes (deadline {deadline_seconds:.0f}s, poll {poll_seconds}s)")
+
+        # Local time minus broker time at a bar's open, learned from arrivals
+        offset: Optional[float] = None
+        last_bar = self._latest_bar_time(tf_name) if tf_name else None
+        anchor = time.time()
+        cycle = 0
         while True:
             try:
+                bar_open = None
+                expected_close = detected = time.time()
+                if cycle > 0:
+                    if tf_name:
+                        # Without a known previous bar the wait returns the bar already forming,
+                        # whose arrival says nothing about the broker clock
+                        transition = last_bar is not None
+                        bar_open, detected = self._wait_for_new_bar(tf_name, last_bar, offset, period,
+                                                                    deadline_seconds, poll_seconds)
+                        if transition:
+                            # The smallest observed arrival delay is the best clock offset estimate
+                            observed = detected - bar_open
+                            offset = observed if offset is None else min(offset, observed)
+                        expected_close = bar_open + offset if offset is not None else detected
+                        last_bar = bar_open
+                    else:
+                        expected_close = anchor + cycle * period
+                        time.sleep(max(0.0, expected_close - time.time()))
+                        detected = time.time()
+                cycle += 1
+
+                started = time.time()
                 prediction_method()
-                print(f"\nWaiting {interval_minutes} minutes until next cycle...")
-                time.sleep(interval_minutes * 60)
+                finished = time.time()
+
+                if cycle > 1:
+                    publish_lag = finished - expected_close
+                    metrics = {
+                        'cycle_start': datetime.fromtimestamp(started).isoformat(),
+                        'timeframe': tf_name,
+                        'bar_open': datetime.utcfromtimestamp(bar_open).isoformat() if bar_open is not None else None,
+                        'detection_lag_s': round(detected - expected_close, 3),
+                        'cycle_s': round(finished - started, 3),
+                        'publish_lag_s': round(publish_lag, 3),
+                        'deadline_met': publish_lag <= deadline_seconds
+                    }
+                    self._record_cycle_metrics(metrics)
+                    print(f"\nBar close -> detected +{metrics['detection_lag_s']:.1f}s, "
+                          f"published +{publish_lag:.1f}s "
+                          f"({'within' if metrics['deadline_met'] else 'MISSED'} {deadline_seconds:.0f}s deadline)")
+
+                if tf_name:
+                    print(f"\nWaiting for the next {tf_name} bar close...")
+                else:
+                    print(f"\nWaiting {interval_minutes} minutes until next cycle...")
             except KeyboardInterrupt:
                 print("\nService stopped by user.")
                 break
@@ -2450,6 +4696,358 @@ class UnifiedLSTMPredictor:
                 traceback.print_exc()
                 print("Retrying in 5 minutes...")
                 time.sleep(300)
+                # Re-run on whatever bar is newest once the pause is over
+                last_bar = None
+
+
+# --- Multi-symbol runner ---
+
+class MultiSymbolRunner:
+    """
+    Serve several symbols from one process.
+
+    All predictors share the data source (one MT5 session) and the TensorFlow
+    runtime, so an extra symbol only costs its own model weights.  Macro data
+    (DXY/SPX) is fetched once per cycle by the first predictor and handed to
+    the others; the per-symbol cycles then run on a thread pool, where
+    TensorFlow and LightGBM inference release the GIL.
+    """
+
+    def __init__(self, predictors: List['UnifiedLSTMPredictor'], workers: Optional[int] = None):
+        if not predictors:
+            raise ValueError("MultiSymbolRunner needs at least one predictor")
+        self.predictors = predictors
+        self.workers = max(1, workers or len(predictors))
+
+    def load_models(self) -> None:
+        """
+        Load every symbol's models and ensemble state before the pool starts.
+
+        Done one symbol at a time so the lazy TensorFlow import and Keras layer
+        registration never race across worker threads.  A symbol that fails to
+        load here falls back to the lazy load inside its own cycle.
+        """
+        for predictor in self.predictors:
+            loaded = (predictor.load_model_assets_multitimeframe() if predictor.use_multitimeframe
+                      else predictor.load_model_assets())
+            if loaded:
+                # The cycles only restore when they load the models themselves
+                predictor._restore_ensemble_state()
+            else:
+                print(f"   Warning: could not preload models for {predictor.symbol}")
+
+    def _run_symbol(self, predictor: 'UnifiedLSTMPredictor') -> float:
+        start = time.perf_counter()
+        if predictor.use_multitimeframe:
+            predictor.run_prediction_cycle_multitimeframe()
+        else:
+            predictor.run_prediction_cycle()
+        return time.perf_counter() - start
+
+    def run_cycle(self) -> None:
+        """Run one prediction cycle for every symbol."""
+        symbols = [p.symbol for p in self.predictors]
+        print(f"\n--- Multi-Symbol Cycle: {', '.join(symbols)} ---")
+
+        start = time.perf_counter()
+        macro = self.predictors[0]._download_macro_data(300)
+        print(f"   Macro data fetched once for {len(symbols)} symbols "
+              f"({(time.perf_counter() - start) * 1000:.0f}ms)")
+        for predictor in self.predictors:
+            predictor.shared_macro = macro
+
+        timings: Dict[str, Any] = {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = {pool.submit(self._run_symbol, p): p.symbol for p in self.predictors}
+                for future in as_completed(futures):
+                    symbol = futures[future]
+                    try:
+                        timings[symbol] = future.result()
+                    except Exception as e:
+                        print(f"ERROR: Prediction cycle for {symbol} failed: {e}")
+                        timings[symbol] = None
+        finally:
+            for predictor in self.predictors:
+                predictor.shared_macro = None
+
+        print("\nMulti-symbol cycle times:")
+        for symbol in symbols:
+            seconds = timings.get(symbol)
+            print(f"  {symbol:<10} {'failed' if seconds is None else f'{seconds:.2f}s'}")
+
+    def run_continuous(self, interval_minutes: int = 60, deadline_seconds: float = 30.0,
+                       poll_seconds: float = 1.0) -> None:
+        """Run cycles for all symbols, aligned to the first symbol's bar closes."""
+        self.predictors[0].run_continuous(interval_minutes=interval_minutes, deadline_seconds=deadline_seconds,
+                                          poll_seconds=poll_seconds, prediction_method=self.run_cycle)
+
+
+# --- Prediction daemon ---
+
+DAEMON_DEFAULT_PORT = 5577
+
+
+class PredictionDaemon:
+    """
+    Long-lived predictor service that keeps models loaded between requests.
+
+    Listens on a local TCP port for newline-delimited JSON commands and
+    answers each with one JSON line ``{"ok": ..., "result" | "error": ..., "seconds": ...}``:
+
+        {"cmd": "predict"}
+        {"cmd": "backtest", "predict_start": "YYYY-MM-DD", "predict_end": "YYYY-MM-DD", "batch_size": 1024}
+        {"cmd": "safe-backtest", "predict_start": "YYYY-MM-DD", "predict_end": "YYYY-MM-DD", "workers": 1}
+        {"cmd": "reload"}
+        {"cmd": "status"}
+        {"cmd": "shutdown"}
+
+    Commands run one at a time.  A background thread watches the training
+    cutoff manifest, which both train modes write last, and reloads the
+    models once a training run has finished.
+    """
+
+    def __init__(self, predictor: 'UnifiedLSTMPredictor', host: str = '127.0.0.1',
+                 port: int = DAEMON_DEFAULT_PORT, watch_seconds: float = 10.0):
+        self.predictor = predictor
+        self.host = host
+        self.port = port
+        self.watch_seconds = watch_seconds
+        self._lock = threading.Lock()
+        self._running = False
+        self._started = time.time()
+        self._requests: Dict[str, int] = defaultdict(int)
+        self._last_reload: Optional[str] = None
+        self._manifest_mtime = self._training_mtime()
+
+    def _training_mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.predictor.cutoff_manifest_path)
+        except OSError:
+            return None
+
+    def _load_assets(self) -> bool:
+        predictor = self.predictor
+        loaded = (predictor.load_model_assets_multitimeframe() if predictor.use_multitimeframe
+                  else predictor.load_model_assets())
+        if loaded:
+            # The cycles only restore when they load the models themselves
+            predictor._restore_ensemble_state()
+        return loaded
+
+    def reload(self) -> bool:
+        """Drop every loaded model and scaler and load them again from disk."""
+        predictor = self.predictor
+        predictor.models = {}
+        predictor.models_by_timeframe = {}
+        predictor.scalers_by_timeframe = {}
+        # Feature columns may have changed with the new models
+        predictor.feature_engine = None
+        loaded = self._load_assets()
+        self._last_reload = datetime.now().isoformat()
+        return loaded
+
+    def _watch_training(self) -> None:
+        while self._running:
+            time.sleep(self.watch_seconds)
+            mtime = self._training_mtime()
+            if mtime is not None and mtime != self._manifest_mtime:
+                with self._lock:
+                    print("\n[DAEMON] Training finished, hot-reloading models...")
+                    self._manifest_mtime = mtime
+                    if not self.reload():
+                        print("[DAEMON] WARNING: Reload failed, keeping the daemon running without models")
+
+    def _run_with_window(self, request: Dict[str, Any], action) -> None:
+        """
+        Run a backtest with the request's prediction window, restoring the predictor's own afterwards.
+
+        Live models served from TFLite exports are set aside for the backtest,
+        which loads the Keras models to run its large batches.
+        """
+        predictor = self.predictor
+        saved = (predictor.predict_start, predictor.predict_end)
+        live_models = None
+        if predictor.prefer_tflite and predictor.models_by_timeframe:
+            live_models = (predictor.models_by_timeframe, predictor.scalers_by_timeframe, predictor.tensor_inputs)
+            predictor.models_by_timeframe, predictor.scalers_by_timeframe = {}, {}
+            predictor.prefer_tflite = False
+        try:
+            for key in ('predict_start', 'predict_end'):
+                if request.get(key):
+                    setattr(predictor, key, datetime.strptime(request[key], "%Y-%m-%d"))
+            action()
+        finally:
+            predictor.predict_start, predictor.predict_end = saved
+            if live_models is not None:
+                predictor.models_by_timeframe, predictor.scalers_by_timeframe, predictor.tensor_inputs = live_models
+                predictor.prefer_tflite = True
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute one command and build its response."""
+        cmd = request.get('cmd')
+        self._requests[cmd] += 1
+        predictor = self.predictor
+        start = time.time()
+        try:
+            with self._lock:
+                if cmd == 'predict':
+                    if predictor.use_multitimeframe:
+                        predictor.run_prediction_cycle_multitimeframe()
+                    else:
+                        predictor.run_prediction_cycle()
+                    with open(predictor.predictions_file, 'r') as f:
+                        result: Any = {'predictions': json.load(f), 'fetch_latency_ms': predictor.last_fetch_latency}
+                elif cmd == 'backtest':
+                    self._run_with_window(request, lambda: predictor.run_backtest_generation(
+                        batch_size=int(request.get('batch_size', 1024))))
+                    result = {'output_dir': predictor.base_path}
+                elif cmd == 'safe-backtest':
+                    self._run_with_window(request, lambda: predictor.run_safe_backtest(
+                        workers=int(request.get('workers', 1))))
+                    result = {'output_dir': predictor.base_path}
+                elif cmd == 'reload':
+                    if not self.reload():
+                        raise RuntimeError("model assets could not be loaded")
+                    result = {'reloaded_at': self._last_reload}
+                elif cmd == 'status':
+                    result = {
+                        'symbol': predictor.symbol,
+                        'multitimeframe': predictor.use_multitimeframe,
+                        'models': predictor.ensemble_model_types,
+                        'loaded': bool(predictor.models_by_timeframe or predictor.models),
+                        'uptime_s': round(time.time() - self._started, 1),
+                        'last_reload': self._last_reload,
+                        'requests': dict(self._requests)
+                    }
+                elif cmd == 'shutdown':
+                    self._running = False
+                    result = 'shutting down'
+                else:
+                    raise ValueError(f"unknown command {cmd!r}")
+            return {'ok': True, 'result': result, 'seconds': round(time.time() - start, 3)}
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return {'ok': False, 'error': str(e), 'seconds': round(time.time() - start, 3)}
+
+    def _serve_connection(self, conn: socket.socket) -> None:
+        with conn, conn.makefile('rb') as reader:
+            for line in reader:
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as e:
+                    response = {'ok': False, 'error': f"invalid JSON: {e}"}
+                else:
+                    print(f"\n[DAEMON] {datetime.now().strftime('%H:%M:%S')} <- {request.get('cmd')}")
+                    response = self.handle(request)
+                conn.sendall((json.dumps(response, default=str) + "\n").encode('utf-8'))
+                if not self._running:
+                    break
+
+    def serve_forever(self) -> None:
+        """Load the models, then answer commands until a shutdown command or Ctrl+C."""
+        if not self._load_assets():
+            print("[DAEMON] WARNING: No models loaded yet; send 'reload' after training")
+        self._last_reload = datetime.now().isoformat()
+        self._running = True
+        threading.Thread(target=self._watch_training, daemon=True).start()
+
+        with socket.create_server((self.host, self.port)) as server:
+            server.settimeout(1.0)
+            print(f"\n[DAEMON] Listening on {self.host}:{self.port} for {self.predictor.symbol}")
+            try:
+                while self._running:
+                    try:
+                        conn, _ = server.accept()
+                    except socket.timeout:
+                        continue
+                    conn.settimeout(None)
+                    try:
+                        self._serve_connection(conn)
+                    except OSError as e:
+                        print(f"[DAEMON] Connection error: {e}")
+            except KeyboardInterrupt:
+                print("\nService stopped by user.")
+            finally:
+                self._running = False
+        print("[DAEMON] Stopped.")
+
+
+def send_daemon_command(command: Dict[str, Any], host: str = '127.0.0.1', port: int = DAEMON_DEFAULT_PORT,
+                        timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Send one command to a running PredictionDaemon and return its response.
+
+    Args:
+        command: Request such as {"cmd": "predict"}
+        host: Daemon host
+        port: Daemon port
+        timeout: Seconds to wait for the response (None waits for long backtests)
+
+    Returns:
+        Parsed response dict
+    """
+    with socket.create_connection((host, port), timeout=timeout) as conn:
+        conn.sendall((json.dumps(command) + "\n").encode('utf-8'))
+        with conn.makefile('rb') as reader:
+            return json.loads(reader.readline())
+
+
+# --- Safe backtest worker processes ---
+
+_SAFE_BACKTEST_WORKER: Dict[str, Any] = {}
+
+
+def _safe_backtest_worker_init(predictor_args: Dict[str, Any], use_multitf: bool,
+                               df_selected: pd.DataFrame, intra_op_threads: int) -> None:
+    """Load the models once per worker process."""
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except RuntimeError:
+        pass  # TF already initialised in this process
+    predictor = UnifiedLSTMPredictor(connect_mt5=False, **predictor_args)
+    loaded = predictor.load_model_assets_multitimeframe() if use_multitf else predictor.load_model_assets()
+    if not loaded:
+        raise RuntimeError("worker could not load model assets")
+    _SAFE_BACKTEST_WORKER.update(predictor=predictor, use_multitf=use_multitf, df_selected=df_selected)
+
+
+def _safe_backtest_worker_run(fold_idx: np.ndarray, lgbm_log_returns: Dict[Tuple[str, str], np.ndarray],
+                              timeframes: Dict[str, int], label: str) -> Dict[str, Dict[str, List]]:
+    """Run one shard of walk-forward folds inside a worker process."""
+    worker = _SAFE_BACKTEST_WORKER
+    return worker['predictor']._run_safe_backtest_folds(
+        worker['df_selected'], fold_idx, worker['use_multitf'], lgbm_log_returns, timeframes, label
+    )
+
+
+# --- Training worker processes ---
+
+_TRAINING_WORKER: Dict[str, Any] = {}
+
+
+def _training_worker_init(predictor_args: Dict[str, Any], data: Dict[str, Any],
+                          hps_config: Optional[Dict[str, Any]], intra_op_threads: int,
+                          inter_op_threads: int) -> None:
+    """Receive the shared training data once per worker process."""
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    except RuntimeError:
+        pass  # TF already initialised in this process
+    predictor = UnifiedLSTMPredictor(connect_mt5=False, **predictor_args)
+    best_hps = kt.HyperParameters.from_config(hps_config) if hps_config is not None else None
+    _TRAINING_WORKER.update(predictor=predictor, data=data, best_hps=best_hps, n_jobs=intra_op_threads)
+
+
+def _training_worker_run(job: Dict[str, Any]) -> float:
+    """Train one ensemble member inside a worker process."""
+    worker = _TRAINING_WORKER
+    return worker['predictor']._train_member(job, worker['data'], worker['best_hps'], n_jobs=worker['n_jobs'])
 
 
 def main():
@@ -2472,6 +5070,11 @@ def main():
     # Parent: symbol (all modes)
     parent_sym = argparse.ArgumentParser(add_help=False)
     parent_sym.add_argument('--symbol', type=str, default="EURUSD", help="Currency symbol (default: EURUSD).")
+    parent_sym.add_argument('--no-bar-cache', action='store_true',
+                            help="Download all bars from MT5 instead of topping up the local bar cache.")
+    parent_sym.add_argument('--data-dir', type=str, default=None, metavar='DIR',
+                            help="Read bars from a local archive ({SYMBOL}_{H1|H4|D1}.npy/.csv) "
+                                 "instead of the MT5 terminal, e.g. on a Linux server.")
 
     # Parent: training date window (train modes)
     parent_train_dates = argparse.ArgumentParser(add_help=False)
@@ -2511,6 +5114,16 @@ def main():
         help="Train the model ensemble (single timeframe, legacy)."
     )
     p_train.add_argument('--force', action='store_true', help="Force retraining even if saved models exist.")
+    p_train.add_argument('--lazy-windows', action='store_true',
+                         help="Build training windows per batch with tf.data (lower peak RAM).")
+    p_train.add_argument('--train-workers', type=int, default=1,
+                         help="Worker processes to train ensemble members in parallel (default: 1).")
+    p_train.add_argument('--intra-op-threads', type=int, default=None,
+                         help="TensorFlow/LightGBM threads per worker (default: cores / workers).")
+    p_train.add_argument('--inter-op-threads', type=int, default=None,
+                         help="TensorFlow inter-op threads per worker (default: 1 with workers).")
+    p_train.add_argument('--no-tflite', action='store_true',
+                         help="Skip exporting the trained DL models to TFLite for live serving.")
     p_train.add_argument(
         '--models', nargs='+',
         default=['lstm', 'transformer', 'lgbm'],
@@ -2524,6 +5137,18 @@ def main():
         help="Train separate ensembles for 1H/4H/1D (RECOMMENDED)."
     )
     p_train_mtf.add_argument('--force', action='store_true', help="Force retraining even if saved models exist.")
+    p_train_mtf.add_argument('--lazy-windows', action='store_true',
+                             help="Build training windows per batch with tf.data (lower peak RAM).")
+    p_train_mtf.add_argument('--train-workers', type=int, default=1,
+                             help="Worker processes to train ensemble members in parallel (default: 1).")
+    p_train_mtf.add_argument('--intra-op-threads', type=int, default=None,
+                             help="TensorFlow/LightGBM threads per worker (default: cores / workers).")
+    p_train_mtf.add_argument('--inter-op-threads', type=int, default=None,
+                             help="TensorFlow inter-op threads per worker (default: 1 with workers).")
+    p_train_mtf.add_argument('--no-tflite', action='store_true',
+                             help="Skip exporting the trained DL models to TFLite for live serving.")
+    p_train_mtf.add_argument('--multi-head', action='store_true',
+                             help="Train one DL model per ensemble member with a 1H/4H/1D output head each.")
     p_train_mtf.add_argument(
         '--models', nargs='+',
         default=['lstm', 'transformer', 'lgbm'],
@@ -2534,6 +5159,22 @@ def main():
     # tune
     subparsers.add_parser('tune', parents=[parent_sym], help="Run hyperparameter tuning for DL models.")
 
+    # export-tflite  (convert already trained models for live serving)
+    p_export = subparsers.add_parser(
+        'export-tflite', parents=[parent_sym],
+        help="Convert trained Keras models to TFLite and check their outputs against Keras."
+    )
+    p_export.add_argument('--tolerance', type=float, default=INFERENCE_PARITY_TOLERANCE,
+                          help=f"Largest accepted output difference (default: {INFERENCE_PARITY_TOLERANCE:g}).")
+
+    # check-features  (streaming feature engine vs create_features)
+    p_check = subparsers.add_parser(
+        'check-features', parents=[parent_sym],
+        help="Verify the live streaming feature engine matches create_features() on history."
+    )
+    p_check.add_argument('--bars', type=int, default=3000, help="H1 bars of history to replay.")
+    p_check.add_argument('--step', type=int, default=1, help="Bars between simulated live cycles.")
+
     # predict  (single-timeframe, live)
     p_predict = subparsers.add_parser(
         'predict', parents=[parent_sym],
@@ -2541,9 +5182,21 @@ def main():
     )
     p_predict.add_argument('--continuous', action='store_true', help="Loop continuously.")
     p_predict.add_argument('--interval', type=int, default=60, help="Minutes between cycles in continuous mode.")
+    p_predict.add_argument('--deadline', type=float, default=30.0,
+                           help="Seconds after a bar close by which predictions should be published.")
+    p_predict.add_argument('--poll', type=float, default=1.0,
+                           help="Seconds between checks for a new bar in continuous mode.")
     p_predict.add_argument('--models', nargs='+', choices=['lstm', 'gru', 'transformer', 'tcn', 'lgbm'],
                            help="Override automatic model detection.")
     p_predict.add_argument('--no-kalman', action='store_true', help="Disable Kalman filtering (use EMA).")
+    p_predict.add_argument('--binary-output', action='store_true',
+                           help="Also publish SYMBOL_predictions.bin (fixed-size record for the EA).")
+    p_predict.add_argument('--keras-inference', action='store_true',
+                           help="Serve the .keras models even where a TFLite export exists.")
+    p_predict.add_argument('--symbols', nargs='+', metavar='SYMBOL',
+                           help="Serve several symbols from one process (overrides --symbol).")
+    p_predict.add_argument('--symbol-workers', type=int, default=None,
+                           help="Symbols predicted concurrently with --symbols (default: all).")
 
     # predict-multitf  (recommended live mode)
     p_predict_mtf = subparsers.add_parser(
@@ -2552,30 +5205,93 @@ def main():
     )
     p_predict_mtf.add_argument('--continuous', action='store_true', help="Loop continuously.")
     p_predict_mtf.add_argument('--interval', type=int, default=60, help="Minutes between cycles in continuous mode.")
+    p_predict_mtf.add_argument('--deadline', type=float, default=30.0,
+                               help="Seconds after a bar close by which predictions should be published.")
+    p_predict_mtf.add_argument('--poll', type=float, default=1.0,
+                               help="Seconds between checks for a new bar in continuous mode.")
     p_predict_mtf.add_argument('--models', nargs='+', choices=['lstm', 'gru', 'transformer', 'tcn', 'lgbm'],
                                help="Override automatic model detection.")
     p_predict_mtf.add_argument('--no-kalman', action='store_true', help="Disable Kalman filtering (use EMA).")
+    p_predict_mtf.add_argument('--binary-output', action='store_true',
+                               help="Also publish SYMBOL_predictions.bin (fixed-size record for the EA).")
+    p_predict_mtf.add_argument('--keras-inference', action='store_true',
+                               help="Serve the .keras models even where a TFLite export exists.")
+    p_predict_mtf.add_argument('--symbols', nargs='+', metavar='SYMBOL',
+                               help="Serve several symbols from one process (overrides --symbol).")
+    p_predict_mtf.add_argument('--symbol-workers', type=int, default=None,
+                               help="Symbols predicted concurrently with --symbols (default: all).")
 
     # backtest  (generate lookup CSVs for MT5 Strategy Tester)
-    subparsers.add_parser(
+    p_backtest = subparsers.add_parser(
         'backtest', parents=[parent_sym, parent_pred_dates],
         help="Generate prediction lookup CSVs for MT5 Strategy Tester.  "
              "Use --predict-start / --predict-end to restrict the date range."
     )
+    p_backtest.add_argument('--batch-size', type=int, default=1024,
+                            help="Bars per deep learning forward pass during generation.")
 
     # safe-backtest  (walk-forward, no look-ahead)
-    subparsers.add_parser(
+    p_safe = subparsers.add_parser(
         'safe-backtest', parents=[parent_sym, parent_pred_dates],
         help="Walk-forward backtest that prevents look-ahead bias.  "
              "Use --predict-start / --predict-end to restrict the date range."
     )
+    p_safe.add_argument('--workers', type=int, default=1,
+                        help="Worker processes to shard walk-forward folds across (default: 1).")
+
+    # serve  (long-lived daemon with models kept in memory)
+    p_serve = subparsers.add_parser(
+        'serve', parents=[parent_sym],
+        help="Run a prediction daemon that keeps models loaded and accepts commands on a local port."
+    )
+    p_serve.add_argument('--port', type=int, default=DAEMON_DEFAULT_PORT,
+                         help=f"Local TCP port to listen on (default: {DAEMON_DEFAULT_PORT}).")
+    p_serve.add_argument('--single-timeframe', action='store_true',
+                         help="Serve the single-timeframe ensemble instead of the 1H/4H/1D models.")
+    p_serve.add_argument('--models', nargs='+', choices=['lstm', 'gru', 'transformer', 'tcn', 'lgbm'],
+                         help="Override automatic model detection.")
+    p_serve.add_argument('--no-kalman', action='store_true', help="Disable Kalman filtering (use EMA).")
+    p_serve.add_argument('--binary-output', action='store_true',
+                         help="Also publish SYMBOL_predictions.bin (fixed-size record for the EA).")
+    p_serve.add_argument('--keras-inference', action='store_true',
+                         help="Serve the .keras models even where a TFLite export exists.")
+
+    # request  (send one command to a running daemon)
+    p_request = subparsers.add_parser(
+        'request', parents=[parent_pred_dates],
+        help="Send a command to a running prediction daemon."
+    )
+    p_request.add_argument('command', choices=['predict', 'backtest', 'safe-backtest', 'reload', 'status', 'shutdown'])
+    p_request.add_argument('--port', type=int, default=DAEMON_DEFAULT_PORT,
+                           help=f"Daemon port (default: {DAEMON_DEFAULT_PORT}).")
+    p_request.add_argument('--batch-size', type=int, default=1024, help="Batch size for 'backtest'.")
+    p_request.add_argument('--workers', type=int, default=1, help="Worker processes for 'safe-backtest'.")
 
     args = parser.parse_args()
 
+    # Daemon client: no predictor needed in this process
+    if args.mode == 'request':
+        command: Dict[str, Any] = {'cmd': args.command}
+        if args.command in ('backtest', 'safe-backtest'):
+            command.update(predict_start=args.predict_start, predict_end=args.predict_end,
+                           batch_size=args.batch_size, workers=args.workers)
+        try:
+            response = send_daemon_command(command, port=args.port)
+        except OSError as e:
+            print(f"ERROR: Could not reach the prediction daemon on port {args.port}: {e}")
+            sys.exit(1)
+        print(json.dumps(response, indent=2, default=str))
+        sys.exit(0 if response.get('ok') else 1)
+
+    check_dependencies()
+
     # ------------------------------------------------------------------
     # Build predictor keyword arguments from parsed args
     # ------------------------------------------------------------------
-    predictor_args: Dict[str, Any] = {'symbol': args.symbol.upper()}
+    data_source = FileDataSource(args.data_dir) if args.data_dir else MT5DataSource()
+    symbol = args.symbols[0] if getattr(args, 'symbols', None) else args.symbol
+    predictor_args: Dict[str, Any] = {'symbol': symbol.upper(), 'use_bar_cache': not args.no_bar_cache,
+                                      'data_source': data_source}
 
     # Training date window
     if hasattr(args, 'train_start') and args.train_start:
@@ -2593,11 +5309,27 @@ def main():
     if args.mode in ['train', 'train-multitf']:
         predictor_args['ensemble_model_types'] = args.models
         predictor_args['use_multitimeframe'] = (args.mode == 'train-multitf')
+        predictor_args['lazy_windows'] = args.lazy_windows
+        predictor_args['train_workers'] = args.train_workers
+        predictor_args['intra_op_threads'] = args.intra_op_threads
+        predictor_args['inter_op_threads'] = args.inter_op_threads
+        predictor_args['export_tflite'] = not args.no_tflite
+        if args.mode == 'train-multitf':
+            predictor_args['multi_head'] = args.multi_head
     elif args.mode in ['predict', 'predict-multitf']:
         if hasattr(args, 'models') and args.models:
             predictor_args['ensemble_model_types'] = args.models
         predictor_args['use_kalman'] = not (hasattr(args, 'no_kalman') and args.no_kalman)
         predictor_args['use_multitimeframe'] = (args.mode == 'predict-multitf')
+        predictor_args['binary_output'] = args.binary_output
+        predictor_args['prefer_tflite'] = not args.keras_inference
+    elif args.mode == 'serve':
+        if args.models:
+            predictor_args['ensemble_model_types'] = args.models
+        predictor_args['use_kalman'] = not args.no_kalman
+        predictor_args['use_multitimeframe'] = not args.single_timeframe
+        predictor_args['binary_output'] = args.binary_output
+        predictor_args['prefer_tflite'] = not args.keras_inference
 
     # Print resolved date windows so user can confirm before training starts
     if any(k in predictor_args for k in ('train_start', 'train_end', 'predict_start', 'predict_end')):
@@ -2613,34 +5345,62 @@ def main():
     # Initialize predictor
     predictor = UnifiedLSTMPredictor(**predictor_args)
 
+    # Extra symbols share the first predictor's data source session
+    runner = None
+    if getattr(args, 'symbols', None):
+        symbols = list(dict.fromkeys(sym.upper() for sym in args.symbols))
+        predictors = [predictor]
+        for sym in symbols[1:]:
+            extra = UnifiedLSTMPredictor(**{**predictor_args, 'symbol': sym, 'connect_mt5': False})
+            extra.ensure_symbols_selected()
+            predictors.append(extra)
+        runner = MultiSymbolRunner(predictors, workers=args.symbol_workers)
+        runner.load_models()
+
     # Execute requested mode
     try:
-        if args.mode == 'tune':
+        if runner is not None:
+            if args.continuous:
+                runner.run_continuous(interval_minutes=args.interval, deadline_seconds=args.deadline,
+                                      poll_seconds=args.poll)
+            else:
+                runner.run_cycle()
+        elif args.mode == 'tune':
             predictor.tune_hyperparameters()
+        elif args.mode == 'export-tflite':
+            if not predictor.export_inference_models(tolerance=args.tolerance):
+                sys.exit(1)
+        elif args.mode == 'check-features':
+            if not predictor.check_feature_parity(bars=args.bars, step=args.step):
+                sys.exit(1)
         elif args.mode == 'train':
             predictor.train_model(force_retrain=args.force)
         elif args.mode == 'train-multitf':
             predictor.train_model_multitimeframe(force_retrain=args.force)
         elif args.mode == 'predict':
             if args.continuous:
-                predictor.run_continuous(interval_minutes=args.interval)
+                predictor.run_continuous(interval_minutes=args.interval, deadline_seconds=args.deadline,
+                                         poll_seconds=args.poll)
             else:
                 predictor.run_prediction_cycle()
         elif args.mode == 'predict-multitf':
             if args.continuous:
-                predictor.run_continuous(interval_minutes=args.interval)
+                predictor.run_continuous(interval_minutes=args.interval, deadline_seconds=args.deadline,
+                                         poll_seconds=args.poll)
             else:
                 predictor.run_prediction_cycle_multitimeframe()
         elif args.mode == 'backtest':
-            predictor.run_backtest_generation()
+            predictor.run_backtest_generation(batch_size=args.batch_size)
         elif args.mode == 'safe-backtest':
-            predictor.run_safe_backtest()
+            predictor.run_safe_backtest(workers=args.workers)
+        elif args.mode == 'serve':
+            PredictionDaemon(predictor, port=args.port).serve_forever()
     except Exception as e:
         print(f"\nFATAL ERROR: {e}")
         import traceback
         traceback.print_exc()
     finally:
-        mt5.shutdown()
+        data_source.shutdown()
         print("\nShutdown complete. Thank you!")
 
 